@@ -7,11 +7,14 @@
 
 import os
 import json
+import time
+import atexit
+import weakref
 import pandas as pd
 from datetime import datetime
 from enum import Enum
 from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
 class ScrapeStatus(Enum):
     """爬取状态枚举"""
@@ -33,9 +36,23 @@ class BatchInfo:
     success_count: int = 0
     failed_count: int = 0
     
+# 每个进度文件当前的所属实例（弱引用）：退出时只写所属实例的进度，被替换的旧实例不会覆盖新进度
+_progress_owners: Dict[str, "weakref.ref[BatchManager]"] = {}
+
+@atexit.register
+def _flush_progress_at_exit():
+    """程序退出时写入尚未保存的进度"""
+    for ref in list(_progress_owners.values()):
+        manager = ref()
+        if manager is not None:
+            manager.flush_progress()
+
 class BatchManager:
     """批次管理器 - 支持断点续传"""
     
+    # 单个项目完成后不立即重写整张进度表，距上次写盘超过该秒数才写；批次结束和退出时强制写盘
+    progress_flush_interval = 10.0
+    
     def __init__(self, master_csv="master_projects.csv", batch_size=50, output_dir="output"):
         self.master_csv = master_csv
         self.batch_size = batch_size
@@ -55,6 +72,11 @@ class BatchManager:
         self.scraped_df = None
         self.batch_status = {}
         
+        # 进度表写盘状态
+        self._progress_dirty = False
+        self._last_progress_flush = time.monotonic()
+        _progress_owners[os.path.abspath(self.scraped_csv)] = weakref.ref(self)
+        
         # 加载数据
         self._load_master_projects()
         self._initialize_scraped_projects()
@@ -229,17 +251,32 @@ class BatchManager:
             self.scraped_df.loc[mask, 'retry_count'] = self.scraped_df.loc[mask, 'retry_count'] + 1
             self.scraped_df.loc[mask, 'error_message'] = error_message
         
-        # 实时保存进度
-        self.scraped_df.to_csv(self.scraped_csv, index=False, encoding='utf-8-sig')
+        # 合并短时间内的多次更新，按时间间隔保存进度
+        self._progress_dirty = True
+        if time.monotonic() - self._last_progress_flush >= self.progress_flush_interval:
+            self.flush_progress()
+    
+    def flush_progress(self):
+        """把尚未保存的项目进度写入进度表"""
+        if not self._progress_dirty or self.scraped_df is None:
+            return
+        try:
+            self.scraped_df.to_csv(self.scraped_csv, index=False, encoding='utf-8-sig')
+            self._progress_dirty = False
+            self._last_progress_flush = time.monotonic()
+        except Exception as e:
+            print(f"❌ 保存爬取进度失败: {e}")
     
     def complete_batch(self, batch_info: BatchInfo, batch_results: List[Dict]):
         """完成批次处理"""
+        self.flush_progress()
+        
         # 保存批次详细数据
         batch_file = os.path.join(self.output_dir, "details", f"batch_{batch_info.batch_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
         
         # 修复：手动转换枚举为字符串，确保JSON可序列化
-        batch_info_dict = asdict(batch_info)
-        batch_info_dict['status'] = batch_info.status.value  # 转换枚举为字符串值
+        # BatchInfo字段都是简单值，浅拷贝即可，不用asdict递归深拷贝
+        batch_info_dict = {**vars(batch_info), 'status': batch_info.status.value}  # 转换枚举为字符串值
         
         batch_data = {
             'batch_info': batch_info_dict,
@@ -277,11 +314,22 @@ class BatchManager:
         combined_data = []
         details_dir = os.path.join(self.output_dir, "details")
         
+        # 只扫描一次目录，记录每个批次最新的文件（文件名中的时间戳可直接比较）
+        latest_batch_files = {}
+        with os.scandir(details_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith('batch_') and name.endswith('.json') and entry.is_file()):
+                    continue
+                batch_id = name[len('batch_'):].split('_', 1)[0]
+                if name > latest_batch_files.get(batch_id, ''):
+                    latest_batch_files[batch_id] = name
+        
         for batch_id in self.batch_status['completed_batches']:
-            batch_files = [f for f in os.listdir(details_dir) if f.startswith(f"batch_{batch_id}_")]
+            batch_name = latest_batch_files.get(batch_id)
             
-            if batch_files:
-                batch_file = os.path.join(details_dir, batch_files[-1])  # 取最新文件
+            if batch_name:
+                batch_file = os.path.join(details_dir, batch_name)  # 取最新文件
                 try:
                     with open(batch_file, 'r', encoding='utf-8') as f:
                         batch_data = json.load(f)
@@ -289,13 +337,18 @@ class BatchManager:
                 except Exception as e:
                     print(f"读取批次文件失败: {batch_file}, 错误: {e}")
         
+        # 按项目ID建立查找表（同一ID保留最先出现的记录），避免每个master项目都线性扫描一遍爬取数据
+        scraped_by_id = {}
+        for p in combined_data:
+            scraped_by_id.setdefault(p.get('id'), p)
+        
         # 与master数据合并
         final_data = []
         for master_project in self.master_projects:
             project_id = master_project['project_id']
             
             # 查找对应的爬取数据
-            scraped_project = next((p for p in combined_data if p.get('id') == project_id), None)
+            scraped_project = scraped_by_id.get(project_id)
             
             # 合并数据
             merged_project = {
@@ -337,9 +390,14 @@ class BatchManager:
         failed_df = self.scraped_df[self.scraped_df['scrape_status'] == ScrapeStatus.FAILED.value]
         failed_projects = []
         
+        # 按项目ID建立查找表（同一ID保留最先出现的记录）
+        master_by_id = {}
+        for p in self.master_projects:
+            master_by_id.setdefault(p['project_id'], p)
+        
         for _, row in failed_df.iterrows():
             project_id = row['project_id']
-            master_project = next((p for p in self.master_projects if p['project_id'] == project_id), None)
+            master_project = master_by_id.get(project_id)
             if master_project:
                 failed_projects.append({
                     **master_project,
@@ -10,6 +10,26 @@ import json
 from datetime import datetime
 from typing import Dict, List
 from collections import defaultdict
+from functools import lru_cache
+
+# orjson可选：读写大体量索引文件更快，未安装时使用标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 常见的营销关键词（用于从标题中提取关键词）
+_MARKETING_KEYWORDS = (
+    '品牌', '营销', '广告', '推广', '活动', '创意', '设计',
+    '传播', '宣传', '发布', '上市', '新品', '促销', '节日',
+    '数字化', '社交', '媒体', '内容', '视频', '直播',
+    '电商', '零售', '消费者', '用户', '体验', '互动'
+)
+
+@lru_cache(maxsize=8192)
+def _title_keywords(title: str) -> tuple:
+    """提取标题关键词（按标题缓存：重复或相同的标题只匹配一次）"""
+    return tuple(keyword for keyword in _MARKETING_KEYWORDS if keyword in title)[:5]  # 限制关键词数量
 
 class DataConverter:
     """数据转换器 - 将合并数据转换为AI系统兼容格式"""
@@ -55,14 +75,35 @@ class DataConverter:
             return {}
         
         try:
-            with open(self.combined_json, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self._read_json(self.combined_json)
             print(f"加载合并数据: {data.get('total_projects', 0)} 个项目")
             return data
         except Exception as e:
             print(f"读取合并数据失败: {e}")
             return {}
     
+    def _read_json(self, filename):
+        """读取JSON文件（优先使用orjson）"""
+        if orjson is not None:
+            with open(filename, 'rb') as f:
+                raw = f.read()
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # json.dump写出的文件可能含NaN（CSV空单元格），orjson不接受，交给标准库解析
+                return json.loads(raw)
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _write_json(self, filename, data):
+        """写入JSON文件（优先使用orjson，缩进2格；orjson会把NaN写成null，标准库写成NaN）"""
+        if orjson is not None:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+    
     def _generate_projects_index(self, combined_data: Dict) -> bool:
         """生成projects_index.json - 兼容现有AI系统格式"""
         try:
@@ -101,8 +142,7 @@ class DataConverter:
             }
             
             # 保存文件
-            with open(self.projects_index_file, 'w', encoding='utf-8') as f:
-                json.dump(projects_index, f, ensure_ascii=False, indent=2)
+            self._write_json(self.projects_index_file, projects_index)
             
             print(f"项目索引生成成功: {len(converted_projects)} 个项目")
             return True
@@ -264,8 +304,7 @@ class DataConverter:
             }
             
             # 保存文件
-            with open(self.global_index_file, 'w', encoding='utf-8') as f:
-                json.dump(global_index, f, ensure_ascii=False, indent=2)
+            self._write_json(self.global_index_file, global_index)
             
             print(f"全局索引生成成功:")
             print(f"  品牌索引: {len(brand_index)} 项")
@@ -283,22 +322,7 @@ class DataConverter:
         if not title:
             return []
         
-        # 常见的营销关键词
-        marketing_keywords = [
-            '品牌', '营销', '广告', '推广', '活动', '创意', '设计',
-            '传播', '宣传', '发布', '上市', '新品', '促销', '节日',
-            '数字化', '社交', '媒体', '内容', '视频', '直播',
-            '电商', '零售', '消费者', '用户', '体验', '互动'
-        ]
-        
-        found_keywords = []
-        title_lower = title.lower()
-        
-        for keyword in marketing_keywords:
-            if keyword in title:
-                found_keywords.append(keyword)
-        
-        return found_keywords[:5]  # 限制关键词数量
+        return list(_title_keywords(title))
     
     def update_indices_incrementally(self, new_projects: List[Dict]):
         """增量更新索引 - 用于新批次数据"""
@@ -5,6 +5,8 @@ DeepSeek API 客户端
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Any
 from config_optimized import get_config
 
@@ -34,6 +36,25 @@ class DeepSeekClient:
 
         self.api_url = "https://aiapi.999.com.cn/v1/chat/completions"
         self.model_name = model_name
+
+        # 复用HTTP连接（keep-alive），避免每次请求重新握手；网络抖动和限流时自动重试
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=(429, 502, 503, 504),
+                      allowed_methods=frozenset({'POST'}))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Accept': '*/*',
+            'Accept-Encoding': '*',
+            'Authorization': f'Bearer {self.api_key}',  # 使用Bearer前缀
+            'Connection': 'keep-alive',
+            'Content-Type': 'application/json'
+        })
+        
+        # 最近一次generate_response是否成功拿到模型回答（失败时返回的是提示文字）
+        self.last_response_ok = False
         
         print(f"DeepSeek client initialized successfully (model={self.model_name})")
 
@@ -48,14 +69,6 @@ class DeepSeekClient:
         Returns:
             AI响应文本
         """
-        headers = {
-            'Accept': '*/*',
-            'Accept-Encoding': '*',
-            'Authorization': f'Bearer {self.api_key}',  # 使用Bearer前缀
-            'Connection': 'keep-alive',
-            'Content-Type': 'application/json'
-        }
-
         messages = []
         if history:
             for item in history:
@@ -68,14 +81,16 @@ class DeepSeekClient:
             "messages": messages
         })
 
+        self.last_response_ok = False
         try:
-            response = requests.post(self.api_url, headers=headers, data=data, timeout=60)
+            response = self.session.post(self.api_url, data=data, timeout=60)
             response.raise_for_status()
             
             response_json = response.json()
             
             if "choices" in response_json and len(response_json["choices"]) > 0:
                 content = response_json["choices"][0].get("message", {}).get("content", "")
+                self.last_response_ok = bool(content)
                 return content
             else:
                 return f"API响应格式不正确: {response.text}"
@@ -6,12 +6,66 @@
 import re
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from lxml import etree, html as lxml_html
+from driver_pool import DriverPool
+
+
+# 图片URL过滤规则（预编译，每张图片只需几次正则匹配）
+_IMAGE_HINT_RE = re.compile(r'\.(?:jpe?g|png|gif|webp|svg)|image|img|upload|pic', re.I)
+_TRUSTED_DOMAIN_RE = re.compile(r'digitaling\.com')  # 覆盖 oss./static. 等子域名
+_ICON_RE = re.compile(r'icon|logo|avatar|thumb', re.I)
+
+# 项目页特征元素（.article-title / .content / h1 / .project-info），一次查询判断是否存在
+_VALID_PAGE_XPATH = (
+    "(//*[contains(@class,'article-title') or contains(@class,'content')"
+    " or contains(@class,'project-info')] | //h1)[1]"
+)
+
+# 标题XPath（按优先级排列，在本地DOM快照上执行，不产生WebDriver往返）
+_TITLE_XPATHS = [
+    etree.XPath("//*[contains(@class,'article-title')]"),   # 主要标题选择器
+    etree.XPath("//h1[contains(@class,'title')]"),          # h1.title / 包含title的h1
+    etree.XPath("//*[contains(@class,'project-title')]"),   # 项目标题类
+    etree.XPath("//h1"),                                    # 通用h1标签
+    etree.XPath("//*[contains(@class,'content-title')]"),   # 内容标题
+]
+
+# 内容区域XPath（与CSS类选择器等价的整词匹配）
+_CONTENT_CONTAINER_XPATHS = [
+    etree.XPath(f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]")
+    for name in ('article-content', 'project-content', 'content', 'main-content', 'detail-content')
+]
+
+# 段落不足时的补充文本：在libxml2中一次筛出长度合适的 div/span/section
+_FALLBACK_TEXT_XPATH = etree.XPath(
+    ".//*[self::div or self::span or self::section]"
+    "[string-length(normalize-space(.)) > 20 and string-length(normalize-space(.)) < 1000]"
+)
+
+# 一次JS调用取回图片地址：[内容区域内的图片, 页面全部图片]
+_JS_COLLECT_IMAGE_SRCS = """
+var selectors = arguments[0];
+var contentSrcs = [];
+for (var i = 0; i < selectors.length; i++) {
+    var imgs = document.querySelectorAll(selectors[i]);
+    for (var j = 0; j < imgs.length; j++) {
+        if (imgs[j].src) { contentSrcs.push(imgs[j].src); }
+    }
+}
+var allSrcs = [];
+var all = document.getElementsByTagName('img');
+for (var k = 0; k < all.length; k++) {
+    if (all[k].src) { allSrcs.push(all[k].src); }
+}
+return [contentSrcs, allSrcs];
+"""
 
 
 class DigitalingPageValidator:
@@ -54,16 +108,8 @@ class DigitalingPageValidator:
                     EC.presence_of_element_located((By.TAG_NAME, 'body'))
                 )
                 
-                # 检查是否存在项目标题或内容区域
-                project_indicators = [
-                    driver.find_elements(By.CSS_SELECTOR, '.article-title'),
-                    driver.find_elements(By.CSS_SELECTOR, '.content'),
-                    driver.find_elements(By.CSS_SELECTOR, 'h1'),
-                    driver.find_elements(By.CSS_SELECTOR, '.project-info')
-                ]
-                
-                # 如果找到任何项目相关元素，认为是有效页面
-                if any(elements for elements in project_indicators):
+                # 如果找到任何项目标题或内容区域元素，认为是有效页面
+                if driver.find_elements(By.XPATH, _VALID_PAGE_XPATH):
                     return True
                 
                 # 检查页面源码中的明确错误信息
@@ -102,6 +148,8 @@ class DigitalingEnhancedParser:
         self.driver = driver
         self.wait = WebDriverWait(driver, 10)
         self.validator = DigitalingPageValidator()
+        self._page_source = None  # 当前页面源码，每页只从浏览器获取一次
+        self._tree = None  # 当前页面的DOM快照（lxml），每页解析一次
     
     def parse_project_detail(self, url: str) -> Optional[Dict]:
         """
@@ -133,6 +181,10 @@ class DigitalingEnhancedParser:
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
             time.sleep(2)
             
+            # 页面加载完成后再做快照，后续提取都基于快照
+            self._page_source = None
+            self._tree = None
+            
             # 提取项目信息
             project_data = {
                 'id': self._extract_project_id(url),
@@ -157,6 +209,21 @@ class DigitalingEnhancedParser:
         except Exception as e:
             print(f"解析失败 {url}: {e}")
             return None
+        finally:
+            self._page_source = None
+            self._tree = None
+    
+    def _get_page_source(self) -> str:
+        """获取当前页面源码（每页只传输一次）"""
+        if self._page_source is None:
+            self._page_source = self.driver.page_source
+        return self._page_source
+    
+    def _get_tree(self):
+        """获取当前页面的DOM快照（首次调用时解析page_source）"""
+        if self._tree is None:
+            self._tree = lxml_html.fromstring(self._get_page_source())
+        return self._tree
     
     def _extract_project_id(self, url: str) -> str:
         """提取项目ID"""
@@ -165,34 +232,25 @@ class DigitalingEnhancedParser:
     
     def _extract_title(self) -> str:
         """提取项目标题"""
-        # 数英网项目标题选择器（按优先级排序）
-        selectors = [
-            '.article-title',          # 主要标题选择器
-            'h1.title',               # 备用标题选择器
-            'h1[class*="title"]',     # 包含title的h1
-            '.project-title',         # 项目标题类
-            'h1',                     # 通用h1标签
-            '.content-title',         # 内容标题
-        ]
+        try:
+            tree = self._get_tree()
+        except Exception as e:
+            print(f"解析页面结构失败: {e}")
+            return ""
         
-        for selector in selectors:
-            try:
-                element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                title = element.text.strip()
+        # 按优先级依次匹配，命中即返回
+        for xpath in _TITLE_XPATHS:
+            for element in xpath(tree):
+                title = ' '.join(element.text_content().split())
                 if title and len(title) > 2:  # 确保标题有意义
                     return title
-            except NoSuchElementException:
-                continue
         
         # 从页面标题中提取
-        try:
-            page_title = self.driver.title
-            if page_title and '|' in page_title:
-                title = page_title.split('|')[0].strip()
-                if title and len(title) > 2:
-                    return title
-        except:
-            pass
+        page_title = tree.findtext('.//title') or ''
+        if '|' in page_title:
+            title = page_title.split('|')[0].strip()
+            if title and len(title) > 2:
+                return title
         
         return ""
     
@@ -234,7 +292,7 @@ class DigitalingEnhancedParser:
         
         # 从页面源码中用正则提取
         try:
-            page_source = self.driver.page_source
+            page_source = self._get_page_source()
             patterns = [
                 r'品牌[：:\s]*<[^>]*>([^<]{2,50})<',
                 r'广告主[：:\s]*<[^>]*>([^<]{2,50})<',
@@ -291,7 +349,7 @@ class DigitalingEnhancedParser:
         
         # 从页面源码中提取
         try:
-            page_source = self.driver.page_source
+            page_source = self._get_page_source()
             patterns = [
                 r'营销机构[：:\s]*<[^>]*>([^<]{2,50})<',
                 r'代理商[：:\s]*<[^>]*>([^<]{2,50})<',
@@ -352,7 +410,7 @@ class DigitalingEnhancedParser:
         
         # 从页面源码中提取日期
         try:
-            page_source = self.driver.page_source
+            page_source = self._get_page_source()
             date_patterns = [
                 r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)',
                 r'datetime="([^"]+)"',
@@ -399,31 +457,31 @@ class DigitalingEnhancedParser:
                 # 如果没找到特定容器，使用body
                 content_container = self.driver.find_element(By.TAG_NAME, 'body')
             
-            # 提取所有段落文本
+            # 提取段落文本（段落数或总长度达到上限即停止，长文章不再逐段检查）
+            total_length = 0
             paragraphs = content_container.find_elements(By.TAG_NAME, 'p')
             for p in paragraphs:
+                if len(description_parts) >= 10 or total_length > 3000:
+                    break
                 text = p.text.strip()
                 if text and len(text) > 10:  # 过滤太短的文本
                     # 检查是否是有意义的内容
-                    if not self._is_noise_text(text) and self._is_content_text(text):
+                    if (not self._is_noise_text(text) and self._is_content_text(text) and
+                            text not in description_parts):
                         description_parts.append(text)
+                        total_length += len(text) + 2  # 加上段落分隔符
             
-            # 如果段落内容不够，尝试提取其他文本元素
+            # 如果段落内容不够，尝试提取其他文本元素（基于DOM快照，避免逐个元素RPC）
             if len(description_parts) < 2:
-                other_selectors = ['div', 'span', 'section']
-                for tag in other_selectors:
-                    elements = content_container.find_elements(By.TAG_NAME, tag)
-                    for elem in elements:
-                        text = elem.text.strip()
-                        if (text and 
-                            len(text) > 20 and 
-                            len(text) < 1000 and 
-                            not self._is_noise_text(text) and 
-                            self._is_content_text(text) and
-                            text not in description_parts):
-                            description_parts.append(text)
-                            if len(description_parts) >= 5:  # 限制数量
-                                break
+                tree_container = self._find_tree_content_container()
+                for elem in _FALLBACK_TEXT_XPATH(tree_container):
+                    text = elem.text_content().strip()
+                    if (not self._is_noise_text(text) and 
+                        self._is_content_text(text) and
+                        text not in description_parts):
+                        description_parts.append(text)
+                        if len(description_parts) >= 5:  # 限制数量
+                            break
             
             # 合并描述
             if description_parts:
@@ -448,6 +506,16 @@ class DigitalingEnhancedParser:
         
         return ""
     
+    def _find_tree_content_container(self):
+        """在DOM快照中查找主要内容区域，找不到时返回body"""
+        tree = self._get_tree()
+        for xpath in _CONTENT_CONTAINER_XPATHS:
+            hits = xpath(tree)
+            if hits:
+                return hits[0]
+        body = tree.find('.//body')
+        return body if body is not None else tree
+    
     def _extract_project_info_section(self) -> Dict[str, str]:
         """提取项目信息区域的结构化数据"""
         project_info = {}
@@ -501,7 +569,7 @@ class DigitalingEnhancedParser:
             
             # 如果没有找到结构化信息区域，尝试从页面文本中提取
             if not project_info:
-                page_text = self.driver.page_source
+                page_text = self._get_page_source()
                 
                 # 使用正则表达式提取关键信息
                 patterns = {
@@ -551,30 +619,13 @@ class DigitalingEnhancedParser:
                 '.main-content img'
             ]
             
-            for selector in content_selectors:
-                try:
-                    img_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    
-                    for img in img_elements:
-                        try:
-                            src = img.get_attribute('src')
-                            if src and self._is_valid_image_url(src):
-                                images.append(src)
-                        except:
-                            continue
-                except:
-                    continue
+            # 一次往返取回内容区域图片和全页图片的地址，不再逐个元素读取src
+            content_srcs, all_srcs = self.driver.execute_script(_JS_COLLECT_IMAGE_SRCS, content_selectors)
+            images = [src for src in content_srcs if self._is_valid_image_url(src)]
             
             # 如果内容区域没有图片，查找所有图片
             if not images:
-                all_images = self.driver.find_elements(By.TAG_NAME, 'img')
-                for img in all_images:
-                    try:
-                        src = img.get_attribute('src')
-                        if src and self._is_valid_image_url(src):
-                            images.append(src)
-                    except:
-                        continue
+                images = [src for src in all_srcs if self._is_valid_image_url(src)]
             
             # 去重并限制数量
             unique_images = list(dict.fromkeys(images))  # 保持顺序的去重
@@ -627,22 +678,60 @@ class DigitalingEnhancedParser:
         if not url or url.startswith('data:'):
             return False
         
-        # 检查是否为图片文件
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']
-        url_lower = url.lower()
-        
-        # 检查文件扩展名或包含图片相关参数
-        is_image = (any(ext in url_lower for ext in image_extensions) or 
-                   'image' in url_lower or 
-                   'img' in url_lower or
-                   'upload' in url_lower or
-                   'pic' in url_lower)
+        # 可信域名（优先数英网图片） + 图片特征（扩展名或图片相关参数） + 过滤小图标和logo
+        return bool(_TRUSTED_DOMAIN_RE.search(url) and
+                    _IMAGE_HINT_RE.search(url) and
+                    not _ICON_RE.search(url))
+
+
+class DigitalingParserPool:
+    """多浏览器并行解析器：每个工作线程独占一个WebDriver"""
+    
+    def __init__(self, size: int = 3, headless: bool = True):
+        """
+        初始化并行解析器
         
-        # 检查域名（优先数英网图片）
-        trusted_domains = ['digitaling.com', 'oss.digitaling.com', 'static.digitaling.com']
-        is_trusted = any(domain in url for domain in trusted_domains)
+        Args:
+            size: 浏览器实例数量（即并发数）
+            headless: 是否无头模式
+        """
+        self.size = size
+        self.driver_pool = DriverPool(pool_size=size, headless=headless)
+    
+    def parse_many(self, urls: List[str]) -> List[Optional[Dict]]:
+        """
+        并行解析多个项目详情页
         
-        # 过滤掉小图标和logo
-        is_small_icon = any(keyword in url_lower for keyword in ['icon', 'logo', 'avatar', 'thumb'])
+        Args:
+            urls: 项目详情页URL列表
+            
+        Returns:
+            与urls顺序一致的结果列表，解析失败的位置为None
+        """
+        if not urls:
+            return []
         
-        return is_image and is_trusted and not is_small_icon
\ No newline at end of file
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(self._parse_one, urls))
+    
+    def _parse_one(self, url: str) -> Optional[Dict]:
+        """工作线程：借用一个WebDriver解析单个页面"""
+        driver = self.driver_pool.get_driver()
+        result = None
+        try:
+            parser = DigitalingEnhancedParser(driver)
+            result = parser.parse_project_detail(url)
+            return result
+        except Exception as e:
+            print(f"解析失败 {url}: {e}")
+            return None
+        finally:
+            # 解析失败时强制探测，浏览器已崩溃则由连接池关闭并补充新实例，保持并发数不变
+            if result is None:
+                driver = self.driver_pool.replace_driver(driver)
+            if driver:
+                self.driver_pool.return_driver(driver)
+    
+    def close(self):
+        """关闭所有浏览器实例"""
+        self.driver_pool.close_all()
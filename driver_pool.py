@@ -7,6 +7,8 @@ import threading
 import time
 import random
 import os
+import weakref
+from functools import lru_cache
 from queue import Queue, Empty
 from contextlib import contextmanager
 from selenium import webdriver
@@ -14,28 +16,91 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 
 
+# 驱动状态（直接记录在driver对象上）
+DRIVER_IDLE = 'idle'
+DRIVER_BUSY = 'busy'
+DRIVER_DEAD = 'dead'
+
+
+@lru_cache(maxsize=1)
+def find_chrome_driver_path():
+    """查找ChromeDriver路径（结果缓存，多个驱动/进程内只扫描一次文件系统）"""
+    possible_names = ['chromedriver.exe', 'chromedriver']
+    possible_dirs = ['.', './drivers', './chromedriver', '../']
+    
+    for dir_path in possible_dirs:
+        for name in possible_names:
+            full_path = os.path.join(dir_path, name)
+            if os.path.exists(full_path):
+                return os.path.abspath(full_path)
+    
+    # 未找到时返回None，由Selenium Manager（Selenium 4.6+）或系统PATH解析
+    return None
+
+
+def _quit_orphaned_driver(command_executor, session_id, service):
+    """
+    驱动对象被回收但未调用quit()时的兜底清理（调用方异常未归还驱动等情况）
+    
+    参数中不能引用driver本身，否则weakref.finalize会让驱动永远无法被回收
+    """
+    try:
+        command_executor.execute('quit', {'sessionId': session_id})
+    except:
+        pass
+    try:
+        if service is not None:
+            service.stop()
+    except:
+        pass
+
+
 class DriverPool:
     """WebDriver连接池"""
     
-    def __init__(self, pool_size=3, max_idle_time=300, headless=True):
+    # 存活探测的最小间隔（秒）：刚验证过的驱动归还时不再发起WebDriver请求
+    liveness_check_interval = 30
+    
+    # Chrome启动参数（所有驱动共用，只构建一次；反反爬虫设置、禁用GPU渲染等）
+    # 不下载图片：解析时只读取img的src属性，图片内容用不到
+    chrome_arguments = (
+        '--disable-blink-features=AutomationControlled',
+        '--no-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-gpu',
+        '--disable-software-rasterizer',
+        '--disable-webgl',
+        '--disable-webgl2',
+        '--window-size=1920,1080',
+        '--blink-settings=imagesEnabled=false',
+    )
+    chrome_prefs = {'profile.managed_default_content_settings.images': 2}
+    
+    def __init__(self, pool_size=3, max_idle_time=300, headless=True, reset_interval=50, prewarm=False):
         """
         初始化连接池
         
         Args:
             pool_size: 连接池大小
-            max_idle_time: 最大空闲时间（秒）
+            max_idle_time: 最大空闲时间（秒），超时的空闲驱动在下次获取时关闭
             headless: 是否无头模式
+            reset_interval: 驱动每使用多少次清理一次浏览器缓存和Cookie（0表示不清理）
+            prewarm: 是否启动时预创建全部驱动（默认按需创建）
         """
         self.pool_size = pool_size
         self.max_idle_time = max_idle_time
         self.headless = headless
+        self.reset_interval = reset_interval
         
-        # 连接池队列
+        # 连接池队列（Queue自带锁，无需再额外加锁）
         self.available_drivers = Queue(maxsize=pool_size)
-        self.busy_drivers = set()
         
-        # 线程锁
-        self.lock = threading.Lock()
+        # 本池创建的所有驱动（弱引用，仅用于状态统计和关闭），忙碌与否看driver._state
+        self._drivers = weakref.WeakSet()
+        
+        # 按需创建驱动时的名额预留：已有驱动数 + 正在创建的数量不超过pool_size
+        self._slot_lock = threading.Lock()
+        self._creating = 0
         
         # 驱动配置
         self.user_agents = [
@@ -45,24 +110,13 @@ class DriverPool:
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0'
         ]
         
-        # 启动时预创建驱动
-        self._initialize_pool()
-        
-        # 启动清理线程
-        self.cleanup_thread = threading.Thread(target=self._cleanup_idle_drivers, daemon=True)
-        self.cleanup_thread.start()
+        # 默认按需创建驱动，只在需要时才付出Chrome启动开销
+        if prewarm:
+            self._initialize_pool()
     
     def find_chrome_driver(self):
         """查找ChromeDriver路径"""
-        possible_names = ['chromedriver.exe', 'chromedriver']
-        possible_dirs = ['.', './drivers', './chromedriver', '../']
-        
-        for dir_path in possible_dirs:
-            for name in possible_names:
-                full_path = os.path.join(dir_path, name)
-                if os.path.exists(full_path):
-                    return os.path.abspath(full_path)
-        return None
+        return find_chrome_driver_path()
     
     def _create_driver(self):
         """创建新的WebDriver实例"""
@@ -71,19 +125,13 @@ class DriverPool:
         if self.headless:
             options.add_argument('--headless')
         
-        # 反反爬虫设置
-        options.add_argument('--disable-blink-features=AutomationControlled')
+        for argument in self.chrome_arguments:
+            options.add_argument(argument)
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-software-rasterizer')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-webgl2')
-        options.add_argument('--window-size=1920,1080')
+        options.add_experimental_option('prefs', self.chrome_prefs)
         
-        # 随机User-Agent
+        # 随机User-Agent（每个驱动唯一不同的参数）
         options.add_argument(f'user-agent={random.choice(self.user_agents)}')
         
         # 创建WebDriver
@@ -98,11 +146,7 @@ class DriverPool:
             # 隐藏webdriver特征
             driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            # 添加元数据
-            driver.last_used = time.time()
-            driver.created_at = time.time()
-            
-            return driver
+            return self._register_driver(driver)
             
         except Exception as e:
             print(f"创建WebDriver失败: {e}")
@@ -113,10 +157,8 @@ class DriverPool:
                 driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
                 
                 driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                driver.last_used = time.time()
-                driver.created_at = time.time()
                 
-                return driver
+                return self._register_driver(driver)
             except ImportError:
                 print("webdriver-manager未安装，请运行: pip install webdriver-manager")
                 raise e
@@ -124,6 +166,37 @@ class DriverPool:
                 print(f"webdriver-manager也失败了: {e2}")
                 raise e
     
+    def _register_driver(self, driver):
+        """添加元数据并登记到连接池"""
+        driver.last_used = time.time()
+        driver.created_at = time.time()
+        driver.use_count = 0
+        driver.last_checked = time.time()
+        driver._state = DRIVER_IDLE
+        # 驱动泄漏（借出后未归还且失去引用）时，回收驱动对象即关闭浏览器进程
+        driver._finalizer = weakref.finalize(
+            driver, _quit_orphaned_driver,
+            driver.command_executor, driver.session_id, getattr(driver, 'service', None))
+        self._drivers.add(driver)
+        return driver
+    
+    def _try_create_driver(self):
+        """池未满时预留一个名额并创建驱动；已满时返回None（检查和预留在同一把锁内，并发调用不会超出pool_size）"""
+        with self._slot_lock:
+            if len(self._drivers) + self._creating >= self.pool_size:
+                return None
+            self._creating += 1
+        try:
+            return self._create_driver()
+        finally:
+            # 成功时驱动已在_register_driver中登记，再释放预留名额
+            with self._slot_lock:
+                self._creating -= 1
+    
+    def _busy_drivers(self):
+        """当前被借出的驱动列表"""
+        return [driver for driver in list(self._drivers) if driver._state == DRIVER_BUSY]
+    
     def _initialize_pool(self):
         """初始化连接池"""
         print(f"正在初始化WebDriver连接池（大小：{self.pool_size}）...")
@@ -138,6 +211,16 @@ class DriverPool:
         
         print(f"WebDriver连接池初始化完成，可用连接数: {self.available_drivers.qsize()}")
     
+    def _get_fresh_idle_driver(self):
+        """从队列取出未超过最大空闲时间的驱动，超时的直接关闭；无可用驱动时抛出Empty"""
+        while True:
+            driver = self.available_drivers.get_nowait()
+            idle_time = time.time() - driver.last_used
+            if idle_time <= self.max_idle_time:
+                return driver
+            self._close_driver(driver)
+            print(f"清理空闲WebDriver（空闲时间：{idle_time:.1f}秒）")
+    
     def get_driver(self, timeout=30):
         """
         获取WebDriver
@@ -148,17 +231,23 @@ class DriverPool:
         Returns:
             WebDriver实例
         """
-        # 尝试从池中获取可用驱动
+        # 优先复用空闲驱动（空闲超时的驱动顺带关闭，不需要后台清理线程）
         try:
-            driver = self.available_drivers.get(timeout=timeout)
+            driver = self._get_fresh_idle_driver()
         except Empty:
-            # 如果池为空，创建新驱动
-            print("⚠ 连接池为空，创建新的WebDriver...")
-            driver = self._create_driver()
+            # 未达到池大小上限时按需创建新驱动
+            driver = self._try_create_driver()
+            if driver is None:
+                # 已达上限，等待其他线程归还
+                try:
+                    driver = self.available_drivers.get(timeout=timeout)
+                except Empty:
+                    # 等待超时，创建新驱动
+                    print("⚠ 连接池为空，创建新的WebDriver...")
+                    driver = self._create_driver()
         
         # 标记为忙碌状态
-        with self.lock:
-            self.busy_drivers.add(driver)
+        driver._state = DRIVER_BUSY
         
         # 更新使用时间
         driver.last_used = time.time()
@@ -178,111 +267,127 @@ class DriverPool:
                 driver.get("https://example.com")
         """
         driver = None
+        failed = False
         try:
             driver = self.get_driver(timeout)
             yield driver
+        except BaseException:
+            failed = True
+            raise
         finally:
             if driver:
-                # 归还驱动到池中
-                self._return_driver(driver)
+                # 归还驱动到池中（使用中出错时强制探测存活）
+                self._return_driver(driver, failed=failed)
+    
+    def return_driver(self, driver, failed=False):
+        """
+        公共方法：归还WebDriver到池中
+        
+        Args:
+            driver: WebDriver实例
+            failed: 调用方使用该驱动时是否出错；出错时不跳过存活探测，已崩溃的驱动直接关闭
+        """
+        self._return_driver(driver, failed=failed)
     
-    def return_driver(self, driver):
-        """公共方法：归还WebDriver到池中"""
-        self._return_driver(driver)
+    def replace_driver(self, driver):
+        """
+        公共方法：探测借出的驱动，已崩溃则关闭并创建新驱动顶替其名额
+        
+        Args:
+            driver: 当前借出的WebDriver实例
+            
+        Returns:
+            仍可用的原驱动、新建的驱动（均为借出状态，用完需归还），重建失败时返回None
+        """
+        if self._is_driver_alive(driver, force=True):
+            return driver
+        
+        self._close_driver(driver)
+        try:
+            new_driver = self._try_create_driver()
+        except Exception as e:
+            print(f"重建WebDriver失败: {e}")
+            return None
+        if new_driver is not None:
+            new_driver._state = DRIVER_BUSY
+            new_driver.last_used = time.time()
+        return new_driver
     
-    def _return_driver(self, driver):
+    def _return_driver(self, driver, failed=False):
         """归还WebDriver到池中"""
         try:
-            # 检查驱动是否还可用
-            if self._is_driver_alive(driver):
+            # 检查驱动是否还可用（出错归还的驱动必须实际探测，不能按探测间隔跳过）
+            if self._is_driver_alive(driver, force=failed):
                 # 更新使用时间
                 driver.last_used = time.time()
                 
-                # 从忙碌集合中移除
-                with self.lock:
-                    self.busy_drivers.discard(driver)
+                # 长时间复用的浏览器定期清理，避免缓存和内存持续增长拖慢后续页面
+                driver.use_count = getattr(driver, 'use_count', 0) + 1
+                if self.reset_interval and driver.use_count % self.reset_interval == 0:
+                    self._reset_driver(driver)
                 
                 # 如果池未满，归还到池中
                 if not self.available_drivers.full():
+                    driver._state = DRIVER_IDLE
                     self.available_drivers.put(driver)
                 else:
                     # 池已满，关闭多余的驱动
                     self._close_driver(driver)
             else:
-                # 驱动不可用，关闭并从忙碌集合中移除
-                with self.lock:
-                    self.busy_drivers.discard(driver)
+                # 驱动不可用，关闭
                 self._close_driver(driver)
                 
         except Exception as e:
             print(f"⚠ 归还WebDriver时出错: {e}")
-            with self.lock:
-                self.busy_drivers.discard(driver)
             self._close_driver(driver)
     
-    def _is_driver_alive(self, driver):
-        """检查WebDriver是否还可用"""
+    def _is_driver_alive(self, driver, force=False):
+        """
+        检查WebDriver是否还可用
+        
+        Args:
+            driver: WebDriver实例
+            force: 是否强制探测（默认在探测间隔内直接视为可用）
+        """
+        now = time.time()
+        if not force and now - getattr(driver, 'last_checked', 0) < self.liveness_check_interval:
+            return True
+        
         try:
             driver.current_url
+            driver.last_checked = now
             return True
         except:
             return False
     
+    def _reset_driver(self, driver):
+        """清理浏览器缓存、Cookie并切换到空白页，让渲染进程释放内存"""
+        try:
+            driver.get('about:blank')
+            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            driver.delete_all_cookies()
+        except Exception as e:
+            print(f"⚠ 清理WebDriver状态时出错: {e}")
+    
     def _close_driver(self, driver):
         """安全关闭WebDriver"""
+        driver._state = DRIVER_DEAD
+        self._drivers.discard(driver)
+        finalizer = getattr(driver, '_finalizer', None)
+        if finalizer is not None:
+            finalizer.detach()
         try:
             driver.quit()
         except:
             pass
     
-    def _cleanup_idle_drivers(self):
-        """清理空闲的WebDriver"""
-        while True:
-            try:
-                time.sleep(60)  # 每分钟检查一次
-                
-                current_time = time.time()
-                drivers_to_remove = []
-                
-                # 检查可用池中的空闲驱动
-                temp_drivers = []
-                while not self.available_drivers.empty():
-                    try:
-                        driver = self.available_drivers.get_nowait()
-                        if (current_time - driver.last_used) > self.max_idle_time:
-                            drivers_to_remove.append(driver)
-                        else:
-                            temp_drivers.append(driver)
-                    except Empty:
-                        break
-                
-                # 重新放回非空闲的驱动
-                for driver in temp_drivers:
-                    self.available_drivers.put(driver)
-                
-                # 关闭空闲的驱动
-                for driver in drivers_to_remove:
-                    self._close_driver(driver)
-                    print(f"清理空闲WebDriver（空闲时间：{current_time - driver.last_used:.1f}秒）")
-                
-                # 确保池中至少有一个驱动
-                if self.available_drivers.empty() and len(self.busy_drivers) == 0:
-                    try:
-                        new_driver = self._create_driver()
-                        self.available_drivers.put(new_driver)
-                        print("创建新的WebDriver以维持连接池")
-                    except Exception as e:
-                        print(f"维护连接池时创建WebDriver失败: {e}")
-                
-            except Exception as e:
-                print(f"⚠ 清理空闲WebDriver时出错: {e}")
-    
     def get_pool_status(self):
         """获取连接池状态"""
+        busy_count = len(self._busy_drivers())
         return {
             "available": self.available_drivers.qsize(),
-            "busy": len(self.busy_drivers),
-            "total": self.available_drivers.qsize() + len(self.busy_drivers),
+            "busy": busy_count,
+            "total": self.available_drivers.qsize() + busy_count,
             "max_size": self.pool_size
         }
     
@@ -290,20 +395,18 @@ class DriverPool:
         """关闭所有WebDriver"""
         print("正在关闭WebDriver连接池...")
         
-        # 关闭可用池中的驱动
-        while not self.available_drivers.empty():
-            try:
-                driver = self.available_drivers.get_nowait()
-                self._close_driver(driver)
-            except Empty:
-                break
+        # 一次加锁取出并清空可用队列，在锁外关闭驱动
+        with self.available_drivers.mutex:
+            idle_drivers = list(self.available_drivers.queue)
+            self.available_drivers.queue.clear()
+            self.available_drivers.not_full.notify_all()
+        for driver in idle_drivers:
+            self._close_driver(driver)
         
         # 关闭忙碌的驱动
-        busy_drivers_copy = list(self.busy_drivers)
-        for driver in busy_drivers_copy:
+        for driver in self._busy_drivers():
             self._close_driver(driver)
         
-        self.busy_drivers.clear()
         print("WebDriver连接池已关闭")
     
     def __del__(self):
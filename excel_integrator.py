@@ -10,11 +10,43 @@ import os
 import re
 from datetime import datetime
 import glob
+from concurrent.futures import ProcessPoolExecutor
+
+# python-calamine可选：原生代码解析xlsx，比默认的openpyxl快很多，未安装时回退
+try:
+    import python_calamine  # noqa: F401
+    _EXCEL_ENGINE = 'calamine'
+except ImportError:
+    _EXCEL_ENGINE = None
+
+# 整合只用到这几列，其余列不读取
+_EXCEL_COLUMNS = ('link', 'brand', 'agency', 'title', 'publish_date')
+
+# pyarrow可选：用原生代码写CSV，未安装时回退到pandas.to_csv
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+# master_projects.csv的列顺序
+_MASTER_COLUMNS = ['project_id', 'url', 'brand', 'agency', 'title', 'publish_date', 'last_updated']
+
+# 预编译的正则表达式
+_PROJECT_ID_RE = re.compile(r'/projects/(\d+)\.html')
+_FILE_DATETIME_RE = re.compile(r'(\d{8})_(\d{6})')
+_FILE_DATE_RE = re.compile(r'(\d{8})')
+_HTML_CLEAN_RE = re.compile(r'&(?:nbsp|amp|lt|gt);|<[^>]+>')  # HTML实体和标签，一次扫描
+
+def _process_excel_file_worker(file_path):
+    """子进程入口：解析单个Excel文件（需为模块级函数才能被多进程序列化）"""
+    return ExcelIntegrator().process_excel_file(file_path)
 
 class ExcelIntegrator:
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
-        self.master_data = {}  # 使用project_id作为键的字典
+        # 按列存储的整合结果（每个project_id一行）
+        self.master_df = pd.DataFrame(columns=_MASTER_COLUMNS)
         self.stats = {
             'total_files': 0,
             'total_records': 0,
@@ -22,26 +54,26 @@ class ExcelIntegrator:
             'duplicates_removed': 0
         }
     
-    def _clean_field_value(self, value):
-        """清理字段值，确保返回字符串"""
-        if pd.isna(value):
-            return ""
-        if not isinstance(value, str):
-            return str(value)
-        return value.strip()
+    def _clean_field_values(self, df, columns):
+        """批量清理字段值（整列向量化）：空值转为空字符串，统一为字符串并去除首尾空白"""
+        columns = list(columns)
+        # 缺失的列补为空字符串，然后对整块列一次性填充空值和转换类型
+        df = df.reindex(columns=df.columns.union(columns, sort=False), fill_value='')
+        df[columns] = df[columns].fillna('').astype(str).apply(lambda s: s.str.strip())
+        return df
     
     def extract_project_id(self, url):
         """从URL中提取项目ID"""
         if pd.isna(url) or not isinstance(url, str):
             return None
         
-        match = re.search(r'/projects/(\d+)\.html', url)
+        match = _PROJECT_ID_RE.search(url)
         return match.group(1) if match else None
     
     def extract_timestamp_from_filename(self, filename):
         """从文件名中提取时间戳"""
         # 匹配格式：digitaling_projects_final_20250806_095833.xlsx
-        match = re.search(r'(\d{8})_(\d{6})', filename)
+        match = _FILE_DATETIME_RE.search(filename)
         if match:
             date_str = match.group(1) + match.group(2)  # 20250806095833
             try:
@@ -50,7 +82,7 @@ class ExcelIntegrator:
                 pass
         
         # 备用匹配：只有日期
-        match = re.search(r'(\d{8})', filename)
+        match = _FILE_DATE_RE.search(filename)
         if match:
             date_str = match.group(1)
             try:
@@ -70,114 +102,118 @@ class ExcelIntegrator:
         
         print(f"找到 {len(excel_files)} 个Excel文件")
         
-        for file_path in excel_files:
-            self.process_excel_file(file_path)
+        # 各文件相互独立且解析是CPU密集型，用多进程绕过GIL并行解析；map保持文件顺序
+        if len(excel_files) > 1:
+            max_workers = min(len(excel_files), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_process_excel_file_worker, excel_files))
+        else:
+            results = [self.process_excel_file(f) for f in excel_files]
+        
+        # 文件时间戳转为名次（相同时间戳名次相同），用于去重时比较新旧
+        timestamps = [self.extract_timestamp_from_filename(os.path.basename(f)) for f in excel_files]
+        timestamp_rank = {ts: i for i, ts in enumerate(sorted(set(timestamps)))}
+        frames = [df.assign(_file_rank=timestamp_rank[ts])
+                  for df, ts in zip(results, timestamps) if df is not None]
+        
+        if frames:
+            combined = pd.concat(frames, ignore_index=True)
+            self.master_df = self._deduplicate_projects(combined)
+            self.stats['total_records'] = len(combined)
+            self.stats['duplicates_removed'] = len(combined) - len(self.master_df)
         
         self.stats['total_files'] = len(excel_files)
-        self.stats['unique_projects'] = len(self.master_data)
+        self.stats['unique_projects'] = len(self.master_df)
         
-        return self.master_data
+        return self.master_df
+    
+    def _deduplicate_projects(self, combined):
+        """
+        按project_id去重：保留文件时间戳最新的记录；时间戳相同（同一文件内或同时间的文件）时保留最先出现的记录。
+        结果按project_id首次出现的顺序排列。
+        """
+        # 稳定排序后取每个ID的第一条：时间戳最新者胜出，同时间戳保持原有先后顺序
+        winners = (combined.sort_values('_file_rank', ascending=False, kind='stable')
+                   .drop_duplicates(subset='project_id', keep='first')
+                   .set_index('project_id'))
+        first_seen = combined['project_id'].drop_duplicates()
+        return winners.loc[first_seen.values].reset_index().drop(columns='_file_rank')
     
     def process_excel_file(self, file_path):
-        """处理单个Excel文件"""
+        """处理单个Excel文件，返回该文件的项目DataFrame，无法处理时返回None"""
         filename = os.path.basename(file_path)
-        timestamp = self.extract_timestamp_from_filename(filename)
         
         print(f"处理文件: {filename}")
         
         try:
-            # 检查是否有"所有项目合并"sheet
-            xl_file = pd.ExcelFile(file_path)
-            if '所有项目合并' not in xl_file.sheet_names:
-                print(f"  警告: {filename} 没有'所有项目合并'sheet，跳过")
-                return
-            
-            # 读取数据
-            df = pd.read_excel(file_path, sheet_name='所有项目合并')
+            # 只打开一次文件：先检查sheet名，再复用同一句柄读取数据
+            with pd.ExcelFile(file_path, engine=_EXCEL_ENGINE) as xl_file:
+                # 检查是否有"所有项目合并"sheet
+                if '所有项目合并' not in xl_file.sheet_names:
+                    print(f"  警告: {filename} 没有'所有项目合并'sheet，跳过")
+                    return None
+                
+                # 读取数据
+                df = xl_file.parse('所有项目合并', usecols=lambda col: col in _EXCEL_COLUMNS, dtype=str)
             print(f"  读取到 {len(df)} 条记录")
             
-            # 处理每一行数据
-            processed_count = 0
-            for _, row in df.iterrows():
-                project_id = self.extract_project_id(row.get('link'))
-                if not project_id:
-                    continue
-                
-                # 创建项目记录 - 确保所有字段都是字符串类型
-                project_record = {
-                    'project_id': project_id,
-                    'url': self._clean_field_value(row.get('link', '')),
-                    'brand': self._clean_field_value(row.get('brand', '')),
-                    'agency': self._clean_field_value(row.get('agency', '')),
-                    'title': self._clean_field_value(row.get('title', '')),
-                    'publish_date': self._clean_field_value(row.get('publish_date', '')),
-                    'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                # 如果项目ID已存在，比较时间戳，保留更新的
-                if project_id in self.master_data:
-                    existing_timestamp = self.master_data[project_id].get('_file_timestamp', datetime.min)
-                    if timestamp > existing_timestamp:
-                        self.master_data[project_id] = project_record
-                        self.master_data[project_id]['_file_timestamp'] = timestamp
-                        self.stats['duplicates_removed'] += 1
-                    else:
-                        self.stats['duplicates_removed'] += 1
-                else:
-                    self.master_data[project_id] = project_record
-                    self.master_data[project_id]['_file_timestamp'] = timestamp
-                
-                processed_count += 1
-                self.stats['total_records'] += 1
+            if 'link' not in df.columns:
+                print(f"  警告: {filename} 没有link列，跳过")
+                return None
+            
+            # 整列提取项目ID，丢弃无法识别的行
+            df['project_id'] = df['link'].astype(str).str.extract(_PROJECT_ID_RE, expand=False)
+            df = df[df['project_id'].notna()].copy()
+            
+            # 整列清理字段 - 确保所有字段都是字符串类型
+            df = self._clean_field_values(df, _EXCEL_COLUMNS)
+            df = df.rename(columns={'link': 'url'})
+            df = df[['project_id', 'url', 'brand', 'agency', 'title', 'publish_date']]
+            
+            # 同一文件的记录共用一个更新时间，只格式化一次
+            df = df.assign(last_updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
             
-            print(f"  处理完成: {processed_count} 条记录")
+            print(f"  处理完成: {len(df)} 条记录")
+            return df
             
         except Exception as e:
             print(f"  错误: 处理文件 {filename} 时出错: {e}")
+            return None
     
     def clean_and_validate(self):
         """数据清理和验证"""
         print("开始数据清理和验证...")
         
-        cleaned_count = 0
-        for project_id, record in self.master_data.items():
-            # 清理agency字段中的HTML标签和特殊字符
-            if record.get('agency'):
-                agency = str(record['agency'])
-                # 移除HTML实体和标签
-                agency = re.sub(r'&nbsp;|&amp;|&lt;|&gt;', '', agency)
-                agency = re.sub(r'<[^>]+>', '', agency)
-                agency = agency.strip()
-                record['agency'] = agency if agency else ''
-            
-            # 标准化日期格式
-            if record.get('publish_date'):
-                # 这里可以添加日期格式标准化逻辑
-                pass
-            
-            # 移除临时字段
-            if '_file_timestamp' in record:
-                del record['_file_timestamp']
-            
-            cleaned_count += 1
+        # 清理agency字段中的HTML标签和特殊字符（整列处理）
+        agency = self.master_df['agency'].fillna('').astype(str)
+        agency = agency.str.replace(_HTML_CLEAN_RE, '', regex=True).str.strip()
+        
+        # 标准化日期格式
+        # 这里可以添加日期格式标准化逻辑
         
-        print(f"清理完成: {cleaned_count} 条记录")
+        # 品牌和代理商重复度很高，转为分类类型：每个唯一值只存一份字符串，行内只存整数编码
+        self.master_df = self.master_df.assign(agency=agency.astype('category'),
+                                               brand=self.master_df['brand'].astype('category'))
+        
+        print(f"清理完成: {len(self.master_df)} 条记录")
     
     def export_master_csv(self, output_path="master_projects.csv"):
         """导出Master CSV文件"""
-        if not self.master_data:
+        if self.master_df.empty:
             print("没有数据可导出")
             return False
         
-        # 转换为DataFrame
-        df = pd.DataFrame.from_dict(self.master_data, orient='index')
-        
         # 重新排序列
-        column_order = ['project_id', 'url', 'brand', 'agency', 'title', 'publish_date', 'last_updated']
-        df = df[column_order]
+        df = self.master_df[_MASTER_COLUMNS]
         
-        # 导出CSV
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
+        # 导出CSV（带BOM，保证Excel直接打开不乱码）
+        if pa is not None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with open(output_path, 'wb') as f:
+                f.write(b'\xef\xbb\xbf')
+                pacsv.write_csv(table, f, write_options=pacsv.WriteOptions(include_header=True))
+        else:
+            df.to_csv(output_path, index=False, encoding='utf-8-sig')
         
         print(f"导出完成: {output_path}")
         print(f"总记录数: {len(df)}")
@@ -192,22 +228,13 @@ class ExcelIntegrator:
         print(f"唯一项目数: {self.stats['unique_projects']}")
         print(f"去重数量: {self.stats['duplicates_removed']}")
         
-        # 品牌和代理商统计
-        brands = set()
-        agencies = set()
-        empty_agency_count = 0
-        
-        for record in self.master_data.values():
-            if record.get('brand'):
-                brands.add(record['brand'])
-            if record.get('agency'):
-                agencies.add(record['agency'])
-            else:
-                empty_agency_count += 1
-        
-        print(f"唯一品牌数: {len(brands)}")
-        print(f"唯一代理商数: {len(agencies)}")
-        print(f"无代理商记录: {empty_agency_count}")
+        # 品牌和代理商统计（字段在读取时已填充空值，无需再fillna）
+        brands = self.master_df['brand']
+        agencies = self.master_df['agency']
+        
+        print(f"唯一品牌数: {brands[brands != ''].nunique()}")
+        print(f"唯一代理商数: {agencies[agencies != ''].nunique()}")
+        print(f"无代理商记录: {int((agencies == '').sum())}")
     
     def run(self):
         """执行完整的整合流程"""
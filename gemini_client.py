@@ -3,15 +3,129 @@ Gemini API 客户端
 处理自然语言查询解析和回答生成（已迁移至 google-genai 客户端接口）
 """
 
+import io
 import json
 import re
 import os
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import Future
+from collections import deque, defaultdict
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
-from google import genai
-from google.genai import types
+from typing import Dict, List, Optional, Any, Tuple, Iterator
 from dataclasses import dataclass
 
+from response_cache import ResponseCache
+
+# google-genai在首次创建客户端时才导入（会带入httpx、pydantic、认证等依赖，
+# 只导入本模块而不调用Gemini的进程无需承担这部分启动开销）
+genai = None
+types = None
+_genai_import_lock = threading.Lock()
+
+
+def _import_genai():
+    """导入google-genai SDK（每个进程只导入一次）"""
+    global genai, types
+    if genai is None:
+        with _genai_import_lock:
+            if genai is None:
+                from google.genai import types as genai_types
+                from google import genai as genai_module
+                types = genai_types
+                genai = genai_module
+    return genai
+
+# orjson可选：解析分析结果更快，未安装时使用标准库json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# numpy可选：仅语义缓存需要，未安装时只使用精确缓存
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 备选分析（关键词匹配）用到的正则和词表，导入时构建一次
+# 查询类型按优先级排列：对比 > 统计 > 分析，都不匹配时为search
+_QUERY_TYPE_PATTERNS = [
+    ('compare', re.compile('对比|比较|vs|和|与')),
+    ('statistics', re.compile('统计|数量|排行|多少|几个')),
+    ('analyze', re.compile('分析|趋势|特点|怎么样')),
+]
+_BRAND_RE = re.compile(r'品牌[\s：:]*([^，,。.！!？?]*)')
+_AGENCY_RE = re.compile(r'代理商[\s：:]*([^，,。.！!？?]*)')
+_STOPWORDS = frozenset(['的', '了', '在', '有', '是', '和', '与'])
+
+
+# 查询分析的固定说明，作为system_instruction发送：每次请求的前缀完全相同，
+# 服务端可命中前缀缓存，请求内容只剩用户查询和上下文
+_ANALYSIS_SYSTEM_PROMPT = """
+你是一个专业的项目数据查询分析助手。请分析用户的查询意图，按给定的JSON结构返回结果。
+
+分析规则：
+1. search: 寻找特定项目、品牌或关键词
+2. compare: 对比两个或多个项目/品牌
+3. analyze: 深度分析项目特点、趋势等
+4. statistics: 统计分析，如数量、排行等
+
+5. 提取所有可能的实体（品牌、代理商、关键词等），没有提到的字段省略
+6. 识别时间相关词汇："最近"=recent，"今年"=2024，"去年"=2023等
+7. 数字词汇转换：一个=1，几个=5，很多=20等
+"""
+
+# 查询分析的结构化输出格式：模型直接返回符合该结构的JSON，无需从文本中提取
+_ANALYSIS_RESPONSE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'query_type': {
+            'type': 'STRING',
+            'enum': ['search', 'compare', 'analyze', 'statistics'],
+            'description': '查询类型',
+        },
+        'entities': {
+            'type': 'OBJECT',
+            'properties': {
+                'brand': {'type': 'STRING', 'description': '品牌名称'},
+                'agency': {'type': 'STRING', 'description': '代理商名称'},
+                'project_name': {'type': 'STRING', 'description': '项目名称'},
+                'industry': {'type': 'STRING', 'description': '行业'},
+                'keywords': {'type': 'ARRAY', 'items': {'type': 'STRING'}, 'description': '关键词'},
+            },
+        },
+        'filters': {
+            'type': 'OBJECT',
+            'properties': {
+                'date_range': {'type': 'STRING', 'description': '时间范围，格式：recent/2023-01/2023-01~2023-12'},
+                'limit': {'type': 'INTEGER', 'description': '结果数量限制'},
+            },
+        },
+        'confidence': {'type': 'NUMBER', 'description': '置信度 (0.0-1.0)'},
+    },
+    'required': ['query_type', 'entities', 'filters', 'confidence'],
+}
+
+
+# 回答提示词中单个项目的摘要模板，缺失字段显示为"未知"（URL缺失时为空）
+_PROJECT_SUMMARY_TMPL = """
+项目{i}:
+- 标题: {title}
+- 品牌: {brand}
+- 代理商: {agency}
+- 发布时间: {publish_date}
+- 分类: {category}
+- URL: {url}
+"""
+
+
+def _unknown_field():
+    return '未知'
+
 
 @dataclass
 class QueryIntent:
@@ -26,13 +140,53 @@ class QueryIntent:
 class GeminiClient:
     """Gemini API 客户端（google-genai）"""
 
-    def __init__(self, api_key: str = None, model_name: str = "gemini-2.5-flash"):
+    # 提示词模板（类加载时定义一次，调用时只做字段替换）
+    _ANALYSIS_TMPL = '用户查询: "{user_query}"\n上下文: {context}'
+    _ANSWER_TMPL = """
+你是一个专业的营销项目分析师。请基于搜索结果回答用户的问题。
+
+用户问题: "{query}"
+搜索结果数量: {result_count}
+查询信息: {query_info}
+
+项目详情:
+{projects_text}
+
+回答要求：
+1. 用自然、专业的中文回答
+2. 根据查询类型调整回答风格：
+   - 搜索类: 列出相关项目，突出关键信息
+   - 对比类: 对比分析项目特点和差异
+   - 分析类: 深入分析趋势、特点、洞察
+   - 统计类: 提供数据统计和排名
+3. 如果结果很多，重点介绍前几个，并说明总数
+4. 如果没有结果，提供搜索建议
+5. 适当引用具体项目信息支撑观点
+6. 保持回答简洁但信息丰富
+
+请开始回答：
+"""
+
+    # 对话历史最多保留的条数，超出后自动丢弃最早的记录
+    max_history = 1000
+
+    # 语义缓存使用的向量模型
+    embedding_model = "text-embedding-004"
+
+    # 按API密钥共享的genai.Client：多个实例复用同一连接池，避免重复TLS握手
+    _shared_clients: Dict[str, "genai.Client"] = {}
+    _shared_clients_lock = threading.Lock()
+
+    def __init__(self, api_key: str = None, model_name: str = "gemini-2.5-flash",
+                 cache_size: int = 256, semantic_cache: bool = False):
         """
         初始化Gemini客户端
 
         Args:
             api_key: Gemini API密钥
             model_name: 使用的模型名称，默认 gemini-2.5-flash
+            cache_size: 回答缓存条数（0表示不缓存）
+            semantic_cache: 是否启用语义缓存（相似问题复用回答，每次查询多一次向量接口调用）
         """
         # 从环境变量或参数获取API密钥
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
@@ -40,20 +194,55 @@ class GeminiClient:
         if not self.api_key:
             raise ValueError("需要提供Gemini API密钥。请设置GEMINI_API_KEY环境变量或传入api_key参数")
 
-        # 初始化新客户端
-        self.client = genai.Client(api_key=self.api_key)
+        # 获取（或首次创建）该密钥共享的客户端
+        self.client = self._get_shared_client(self.api_key)
         self.model_name = model_name
+        self._analysis_config = None
+
+        # 进行中的请求（key -> Future），用于合并并发的相同请求
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
 
         # 对话历史
-        self.conversation_history: List[Dict[str, Any]] = []
+        self.conversation_history: "deque[Dict[str, Any]]" = deque(maxlen=self.max_history)
+
+        # 回答缓存：重复或相似的问题直接返回，不再调用API
+        self.response_cache = ResponseCache(max_size=cache_size) if cache_size else None
+        self.semantic_cache = semantic_cache and np is not None and self.response_cache is not None
+        if semantic_cache and np is None:
+            print("⚠️ 未安装numpy，语义缓存已禁用")
+
+        # 最近一次generate_response是否成功拿到模型回答（失败时返回的是提示文字）
+        self.last_response_ok = False
 
         print(f"Gemini client initialized successfully (model={self.model_name})")
 
-    def _default_generate_config(self) -> types.GenerateContentConfig:
+    @classmethod
+    def _get_shared_client(cls, api_key: str) -> "genai.Client":
+        """获取指定API密钥的共享客户端，同一进程内每个密钥只创建一次"""
+        with cls._shared_clients_lock:
+            client = cls._shared_clients.get(api_key)
+            if client is None:
+                client = _import_genai().Client(api_key=api_key)
+                cls._shared_clients[api_key] = client
+            return client
+
+    def _default_generate_config(self) -> "types.GenerateContentConfig":
         """生成默认的内容生成配置（禁用 thinking，可按需扩展）。"""
         return types.GenerateContentConfig(
             thinking_config=types.ThinkingConfig(thinking_budget=0)
         )
+
+    def _analysis_generate_config(self) -> "types.GenerateContentConfig":
+        """查询分析的生成配置：固定说明放在system_instruction中，结构化JSON输出（首次使用时构建）"""
+        if self._analysis_config is None:
+            self._analysis_config = types.GenerateContentConfig(
+                system_instruction=_ANALYSIS_SYSTEM_PROMPT,
+                response_mime_type='application/json',
+                response_schema=_ANALYSIS_RESPONSE_SCHEMA,
+                thinking_config=types.ThinkingConfig(thinking_budget=0)
+            )
+        return self._analysis_config
     
     def analyze_query(self, user_query: str, context: str = "") -> QueryIntent:
         """
@@ -69,12 +258,18 @@ class GeminiClient:
         # 构建分析提示词
         prompt = self._build_analysis_prompt(user_query, context)
         
+        # 相同的分析请求正在进行时直接等待其结果
+        key = 'analysis:' + hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+        return self._single_flight(key, lambda: self._analyze_prompt(prompt, user_query))
+    
+    def _analyze_prompt(self, prompt: str, user_query: str) -> QueryIntent:
+        """调用API分析已构建好的提示词"""
         try:
             # 调用Gemini API（新接口）
             response = self.client.models.generate_content(
                 model=self.model_name,
                 contents=prompt,
-                config=self._default_generate_config()
+                config=self._analysis_generate_config()
             )
             
             # 解析响应
@@ -86,13 +281,81 @@ class GeminiClient:
             print(f"⚠️ 查询分析失败: {e}")
             
             # 返回默认意图
-            return QueryIntent(
-                query_type="search",
-                entities={},
-                filters={},
-                confidence=0.5,
-                raw_query=user_query
+            return self._default_intent(user_query)
+    
+    def analyze_queries(self, user_queries: List[str], context: str = "") -> List[QueryIntent]:
+        """
+        批量分析多个查询意图（并发请求，总耗时约等于最慢的一次调用）
+        
+        Args:
+            user_queries: 用户查询列表
+            context: 上下文信息
+            
+        Returns:
+            与输入顺序一致的QueryIntent列表
+        """
+        if len(user_queries) <= 1:
+            return [self.analyze_query(query, context) for query in user_queries]
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._analyze_queries_with_own_client(user_queries, context))
+        
+        # 已处于事件循环中（无法嵌套asyncio.run），逐条同步分析；异步调用方应直接await analyze_queries_async
+        return [self.analyze_query(query, context) for query in user_queries]
+    
+    async def _analyze_queries_with_own_client(self, user_queries: List[str], context: str = "") -> List[QueryIntent]:
+        """
+        在asyncio.run创建的临时事件循环中批量分析
+        
+        异步连接池绑定在首次使用它的事件循环上，共享客户端的client.aio不能跨多次asyncio.run复用，
+        因此每批新建一个异步客户端，结束时关闭。
+        """
+        aio = _import_genai().Client(api_key=self.api_key).aio
+        try:
+            return await self.analyze_queries_async(user_queries, context, aio=aio)
+        finally:
+            aclose = getattr(aio, 'aclose', None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+    
+    async def analyze_queries_async(self, user_queries: List[str], context: str = "",
+                                    aio=None) -> List[QueryIntent]:
+        """并发分析多个查询（异步接口），gather保持结果顺序；aio为None时使用共享客户端"""
+        return list(await asyncio.gather(
+            *(self.analyze_query_async(query, context, aio=aio) for query in user_queries)
+        ))
+    
+    async def analyze_query_async(self, user_query: str, context: str = "", aio=None) -> QueryIntent:
+        """分析单个查询意图（异步接口）"""
+        prompt = self._build_analysis_prompt(user_query, context)
+        aio = aio or self.client.aio
+        
+        try:
+            response = await aio.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=self._analysis_generate_config()
             )
+            return self._parse_analysis_result(response.text, user_query)
+        except Exception as e:
+            print(f"⚠️ 查询分析失败: {e}")
+            return self._default_intent(user_query)
+    
+    @staticmethod
+    def _default_intent(user_query: str) -> QueryIntent:
+        """API调用失败时的默认意图"""
+        return QueryIntent(
+            query_type="search",
+            entities={},
+            filters={},
+            confidence=0.5,
+            raw_query=user_query
+        )
     
     def generate_answer(self, query: str, search_results: List[Dict], 
                        query_info: Dict = None) -> str:
@@ -107,74 +370,191 @@ class GeminiClient:
         Returns:
             自然语言回答
         """
+        # 相同的问题（查询+结果集+查询信息）正在生成时直接等待其结果
+        # 与回答缓存使用同一个键
+        key = 'answer:' + ResponseCache.make_key(query, self._result_ids(search_results), query_info)
+        return self._single_flight(
+            key, lambda: ''.join(self.generate_answer_stream(query, search_results, query_info)))
+    
+    def _single_flight(self, key: str, func):
+        """
+        合并并发的相同请求：同一key同时只执行一次func，其余调用方等待并共享结果
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_leader:
+            return future.result()
+        
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def generate_answer_stream(self, query: str, search_results: List[Dict],
+                               query_info: Dict = None) -> Iterator[str]:
+        """
+        流式生成回答：模型每生成一段文本就立即产出，调用方可边接收边展示
+        
+        异步服务中使用generate_answer_async。
+        
+        Args:
+            query: 用户查询
+            search_results: 搜索结果
+            query_info: 查询信息
+            
+        Yields:
+            回答文本片段
+        """
+        # 先查缓存
+        cached, cache_key, result_ids = self._lookup_answer_cache(query, search_results, query_info)
+        embedding = None
+        if cached is None and cache_key is not None and self.semantic_cache:
+            embedding = self._embed_query(query)
+            if embedding is not None:
+                cached = self.response_cache.get_similar(embedding, result_ids)
+        if cached is not None:
+            self._append_history(query, cached, len(search_results))
+            yield cached
+            return
+        
         # 构建回答提示词
         prompt = self._build_answer_prompt(query, search_results, query_info)
         
+        parts = []
         try:
-            # 调用Gemini API（新接口）
-            response = self.client.models.generate_content(
+            # 调用Gemini API（流式接口）
+            for chunk in self.client.models.generate_content_stream(
                 model=self.model_name,
                 contents=prompt,
                 config=self._default_generate_config()
-            )
-            
-            # 添加到对话历史
-            self.conversation_history.append({
-                "query": query,
-                "response": response.text,
-                "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                "result_count": len(search_results)
-            })
-            
-            return response.text
-            
+            ):
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield text
         except Exception as e:
             print(f"⚠️ 回答生成失败: {e}")
             
-            # 返回默认回答
-            if search_results:
-                return f"找到了 {len(search_results)} 个相关项目。由于技术原因，无法提供详细分析，请查看具体项目信息。"
-            else:
-                return "很抱歉，没有找到相关的项目信息。请尝试使用其他关键词。"
+            # 尚未输出任何内容时返回默认回答
+            if not parts:
+                yield self._fallback_answer(search_results)
+            return
+        
+        self._store_answer(query, ''.join(parts), len(search_results), cache_key, result_ids, embedding)
+    
+    async def generate_answer_async(self, query: str, search_results: List[Dict],
+                                    query_info: Dict = None) -> str:
+        """
+        基于搜索结果生成自然语言回答（异步接口）
+        
+        并发服务多个问题时用asyncio.gather组合，单线程即可同时等待多个请求，
+        不必为阻塞的网络IO各开一个线程。
+        """
+        cached, cache_key, result_ids = self._lookup_answer_cache(query, search_results, query_info)
+        embedding = None
+        if cached is None and cache_key is not None and self.semantic_cache:
+            embedding = await self._embed_query_async(query)
+            if embedding is not None:
+                cached = self.response_cache.get_similar(embedding, result_ids)
+        if cached is not None:
+            self._append_history(query, cached, len(search_results))
+            return cached
+        
+        prompt = self._build_answer_prompt(query, search_results, query_info)
+        
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=self._default_generate_config()
+            )
+        except Exception as e:
+            print(f"⚠️ 回答生成失败: {e}")
+            return self._fallback_answer(search_results)
+        
+        answer = response.text or ''
+        self._store_answer(query, answer, len(search_results), cache_key, result_ids, embedding)
+        return answer
+    
+    @staticmethod
+    def _result_ids(search_results: List[Dict]) -> frozenset:
+        """搜索结果的ID集合（优先用url）"""
+        return frozenset(str(r.get('url') or r.get('id', '')) for r in search_results)
+    
+    def _lookup_answer_cache(self, query: str, search_results: List[Dict], query_info: Dict = None):
+        """
+        精确查找回答缓存
+        
+        Returns:
+            (缓存的回答或None, 缓存键, 结果ID集合)；未启用缓存时后两项为None
+        """
+        if self.response_cache is None:
+            return None, None, None
+        result_ids = self._result_ids(search_results)
+        cache_key = ResponseCache.make_key(query, result_ids, query_info)
+        return self.response_cache.get(cache_key), cache_key, result_ids
+    
+    def _store_answer(self, query: str, answer: str, result_count: int,
+                      cache_key: Optional[str], result_ids: Optional[frozenset], embedding=None):
+        """新生成的回答写入缓存和对话历史"""
+        if cache_key is not None and answer:
+            self.response_cache.put(cache_key, answer)
+            if embedding is not None:
+                self.response_cache.put_similar(embedding, result_ids, answer)
+        self._append_history(query, answer, result_count)
+    
+    @staticmethod
+    def _fallback_answer(search_results: List[Dict]) -> str:
+        """回答生成失败时的默认回答"""
+        if search_results:
+            return f"找到了 {len(search_results)} 个相关项目。由于技术原因，无法提供详细分析，请查看具体项目信息。"
+        return "很抱歉，没有找到相关的项目信息。请尝试使用其他关键词。"
+    
+    def _append_history(self, query: str, response_text: str, result_count: int):
+        """添加一条对话历史"""
+        self.conversation_history.append({
+            "query": query,
+            "response": response_text,
+            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "result_count": result_count
+        })
+    
+    def _embed_query(self, query: str):
+        """计算查询的归一化向量（语义缓存用），失败时返回None"""
+        try:
+            response = self.client.models.embed_content(model=self.embedding_model, contents=query)
+            vector = np.asarray(response.embeddings[0].values, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            return vector / norm if norm else None
+        except Exception as e:
+            print(f"⚠️ 查询向量计算失败: {e}")
+            return None
+    
+    async def _embed_query_async(self, query: str):
+        """计算查询的归一化向量（异步接口），失败时返回None"""
+        try:
+            response = await self.client.aio.models.embed_content(model=self.embedding_model, contents=query)
+            vector = np.asarray(response.embeddings[0].values, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            return vector / norm if norm else None
+        except Exception as e:
+            print(f"⚠️ 查询向量计算失败: {e}")
+            return None
     
     def _build_analysis_prompt(self, user_query: str, context: str = "") -> str:
-        """构建查询分析提示词"""
-        prompt = f"""
-你是一个专业的项目数据查询分析助手。请分析用户的查询意图，并以JSON格式返回结构化结果。
-
-用户查询: "{user_query}"
-上下文: {context}
-
-请分析并返回以下信息（JSON格式）：
-{{
-    "query_type": "查询类型 (search/compare/analyze/statistics)",
-    "entities": {{
-        "brand": "品牌名称（如果提到）",
-        "agency": "代理商名称（如果提到）",
-        "project_name": "项目名称（如果提到）",
-        "industry": "行业（如果提到）",
-        "keywords": ["关键词1", "关键词2"]
-    }},
-    "filters": {{
-        "date_range": "时间范围（如果提到，格式：recent/2023-01/2023-01~2023-12）",
-        "limit": "结果数量限制（如果提到，数字）"
-    }},
-    "confidence": "置信度 (0.0-1.0)"
-}}
-
-分析规则：
-1. search: 寻找特定项目、品牌或关键词
-2. compare: 对比两个或多个项目/品牌
-3. analyze: 深度分析项目特点、趋势等
-4. statistics: 统计分析，如数量、排行等
-
-5. 提取所有可能的实体（品牌、代理商、关键词等）
-6. 识别时间相关词汇："最近"=recent，"今年"=2024，"去年"=2023等
-7. 数字词汇转换：一个=1，几个=5，很多=20等
-
-只返回JSON，不要其他文字。
-"""
-        return prompt
+        """构建查询分析提示词（固定的分析说明在_ANALYSIS_SYSTEM_PROMPT中，这里只有每次变化的部分）"""
+        return self._ANALYSIS_TMPL.format(user_query=user_query, context=context)
     
     def _build_answer_prompt(self, query: str, search_results: List[Dict], 
                            query_info: Dict = None) -> str:
@@ -183,58 +563,31 @@ class GeminiClient:
         # 限制搜索结果数量以避免prompt过长
         limited_results = search_results[:10] if len(search_results) > 10 else search_results
         
-        # 构建项目信息摘要
-        projects_summary = []
+        # 构建项目信息摘要（写入同一个缓冲区，不再生成中间列表）
+        buf = io.StringIO()
+        write = buf.write
         for i, project in enumerate(limited_results, 1):
-            summary = f"""
-项目{i}:
-- 标题: {project.get('title', '未知')}
-- 品牌: {project.get('brand', '未知')}
-- 代理商: {project.get('agency', '未知')}
-- 发布时间: {project.get('publish_date', '未知')}
-- 分类: {project.get('category', '未知')}
-- URL: {project.get('url', '')}
-"""
-            projects_summary.append(summary)
+            fields = defaultdict(_unknown_field, project)
+            fields['i'] = i
+            fields.setdefault('url', '')
+            if i > 1:
+                write("\n")
+            write(_PROJECT_SUMMARY_TMPL.format_map(fields))
         
-        projects_text = "\n".join(projects_summary)
+        projects_text = buf.getvalue()
         
-        prompt = f"""
-你是一个专业的营销项目分析师。请基于搜索结果回答用户的问题。
-
-用户问题: "{query}"
-搜索结果数量: {len(search_results)}
-查询信息: {json.dumps(query_info, ensure_ascii=False) if query_info else "无"}
-
-项目详情:
-{projects_text}
-
-回答要求：
-1. 用自然、专业的中文回答
-2. 根据查询类型调整回答风格：
-   - 搜索类: 列出相关项目，突出关键信息
-   - 对比类: 对比分析项目特点和差异
-   - 分析类: 深入分析趋势、特点、洞察
-   - 统计类: 提供数据统计和排名
-3. 如果结果很多，重点介绍前几个，并说明总数
-4. 如果没有结果，提供搜索建议
-5. 适当引用具体项目信息支撑观点
-6. 保持回答简洁但信息丰富
-
-请开始回答：
-"""
-        return prompt
+        return self._ANSWER_TMPL.format(
+            query=query,
+            result_count=len(search_results),
+            query_info=json.dumps(query_info, ensure_ascii=False) if query_info else "无",
+            projects_text=projects_text
+        )
     
     def _parse_analysis_result(self, response_text: str, user_query: str) -> QueryIntent:
         """解析Gemini的分析结果"""
         try:
-            # 提取JSON部分
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if not json_match:
-                raise ValueError("无法找到JSON格式的回答")
-            
-            json_str = json_match.group(0)
-            result = json.loads(json_str)
+            # 结构化输出，回答本身就是JSON
+            result = _json_loads(response_text)
             
             return QueryIntent(
                 query_type=result.get('query_type', 'search'),
@@ -255,33 +608,27 @@ class GeminiClient:
         """备选的查询分析方法（基于关键词匹配）"""
         query_lower = user_query.lower()
         
-        # 查询类型判断
-        if any(word in query_lower for word in ['对比', '比较', 'vs', '和', '与']):
-            query_type = 'compare'
-        elif any(word in query_lower for word in ['统计', '数量', '排行', '多少', '几个']):
-            query_type = 'statistics'
-        elif any(word in query_lower for word in ['分析', '趋势', '特点', '怎么样']):
-            query_type = 'analyze'
-        else:
-            query_type = 'search'
+        # 查询类型判断（每类关键词一次正则扫描）
+        query_type = next((qtype for qtype, pattern in _QUERY_TYPE_PATTERNS
+                           if pattern.search(query_lower)), 'search')
         
         # 简单的实体提取
         entities = {}
         keywords = []
         
         # 品牌关键词
-        brand_keywords = re.findall(r'品牌[\s：:]*([^，,。.！!？?]*)', query_lower)
-        if brand_keywords:
-            entities['brand'] = brand_keywords[0].strip()
+        brand_match = _BRAND_RE.search(query_lower)
+        if brand_match:
+            entities['brand'] = brand_match.group(1).strip()
         
         # 代理商关键词
-        agency_keywords = re.findall(r'代理商[\s：:]*([^，,。.！!？?]*)', query_lower)
-        if agency_keywords:
-            entities['agency'] = agency_keywords[0].strip()
+        agency_match = _AGENCY_RE.search(query_lower)
+        if agency_match:
+            entities['agency'] = agency_match.group(1).strip()
         
         # 通用关键词提取
         for word in query_lower.split():
-            if len(word) > 1 and word not in ['的', '了', '在', '有', '是', '和', '与']:
+            if len(word) > 1 and word not in _STOPWORDS:
                 keywords.append(word)
         
         entities['keywords'] = keywords[:5]  # 限制关键词数量
@@ -305,11 +652,14 @@ class GeminiClient:
     
     def get_conversation_history(self, limit: int = 10) -> List[Dict]:
         """获取对话历史"""
-        return self.conversation_history[-limit:] if limit else self.conversation_history
+        history = self.conversation_history
+        if not limit:
+            return list(history)
+        return list(islice(history, max(0, len(history) - limit), None))
     
     def clear_conversation_history(self):
         """清空对话历史"""
-        self.conversation_history = []
+        self.conversation_history.clear()
         print("✅ 对话历史已清空")
     
     def generate_response(self, prompt: str) -> str:
@@ -322,12 +672,14 @@ class GeminiClient:
         Returns:
             AI响应文本
         """
+        self.last_response_ok = False
         try:
             response = self.client.models.generate_content(
                 model=self.model_name,
                 contents=prompt,
                 config=self._default_generate_config()
             )
+            self.last_response_ok = bool(response.text)
             return response.text
         except Exception as e:
             print(f"❌ Gemini响应生成失败: {e}")
@@ -336,15 +688,41 @@ class GeminiClient:
                 return "AI服务响应超时，请稍后重试或简化您的问题。"
             return "很抱歉，AI服务暂时不可用，请稍后重试。"
 
+    async def generate_response_async(self, prompt: str) -> str:
+        """生成AI响应（通用方法，异步接口）"""
+        self.last_response_ok = False
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=self._default_generate_config()
+            )
+            self.last_response_ok = bool(response.text)
+            return response.text
+        except Exception as e:
+            print(f"❌ Gemini响应生成失败: {e}")
+            if "DeadlineExceeded" in str(e):
+                return "AI服务响应超时，请稍后重试或简化您的问题。"
+            return "很抱歉，AI服务暂时不可用，请稍后重试。"
+
     def test_connection(self) -> bool:
         """测试Gemini API连接"""
         try:
-            response = self.client.models.generate_content(
+            # 流式接收，收到关键词即判定成功并关闭连接，不等完整回复
+            stream = self.client.models.generate_content_stream(
                 model=self.model_name,
                 contents="你好，请回复'连接成功'",
                 config=self._default_generate_config()
             )
-            return "连接" in response.text or "成功" in response.text
+            received = ''
+            try:
+                for chunk in stream:
+                    received += chunk.text or ''
+                    if "连接" in received or "成功" in received:
+                        return True
+            finally:
+                stream.close()
+            return False
         except Exception as e:
             print(f"❌ Gemini API连接测试失败: {e}")
             return False
@@ -373,9 +751,8 @@ if __name__ == "__main__":
             "统计一下各个品牌的项目数量"
         ]
         
-        for query in test_queries:
+        for query, intent in zip(test_queries, client.analyze_queries(test_queries)):
             print(f"\n🔍 测试查询: '{query}'")
-            intent = client.analyze_query(query)
             print(f"查询类型: {intent.query_type}")
             print(f"实体: {intent.entities}")
             print(f"过滤条件: {intent.filters}")
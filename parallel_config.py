@@ -5,16 +5,53 @@
 根据不同场景提供优化的并发参数
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Mapping
+from types import MappingProxyType
+from functools import lru_cache
 import psutil
 import os
+import time
+
+
+@lru_cache(maxsize=1)
+def _cpu_count():
+    """CPU核心数（进程生命周期内不变，只查询一次）"""
+    return psutil.cpu_count()
+
+
+# 内存信息缓存：(获取时间, virtual_memory快照)
+_memory_snapshot = (0.0, None)
+_MEMORY_SNAPSHOT_TTL = 1.0  # 秒
+
+
+def _virtual_memory():
+    """内存信息（1秒内的重复调用复用上次结果，避免反复读取/proc/meminfo）"""
+    global _memory_snapshot
+    checked_at, snapshot = _memory_snapshot
+    now = time.monotonic()
+    if snapshot is None or now - checked_at >= _MEMORY_SNAPSHOT_TTL:
+        snapshot = psutil.virtual_memory()
+        _memory_snapshot = (now, snapshot)
+    return snapshot
+
+
+def _freeze(config: Dict) -> Mapping:
+    """把预设配置（含嵌套的delay_config）转为只读映射"""
+    return MappingProxyType({key: _freeze(value) if isinstance(value, dict) else value
+                             for key, value in config.items()})
+
+
+def _thaw(config: Mapping) -> Dict[str, Any]:
+    """把只读预设还原为可修改的普通dict（深拷贝，修改不会影响预设）"""
+    return {key: _thaw(value) if isinstance(value, Mapping) else value
+            for key, value in config.items()}
 
 
 class ParallelConfig:
     """并发配置管理器"""
     
-    # 预设配置方案
-    PRESETS = {
+    # 预设配置方案（只读，防止调用方修改返回值污染全局预设）
+    PRESETS = _freeze({
         'conservative': {
             'name': '保守模式',
             'description': '稳定性优先适合网络不稳定环境',
@@ -74,22 +111,30 @@ class ParallelConfig:
             'max_retries': 1,
             'timeout': 20
         }
-    }
+    })
     
     @classmethod
-    def get_preset(cls, preset_name: str) -> Dict[str, Any]:
-        """获取预设配置"""
+    def get_preset(cls, preset_name: str, mutable: bool = False) -> Mapping[str, Any]:
+        """
+        获取预设配置
+        
+        Args:
+            preset_name: 预设名称
+            mutable: 是否需要修改返回值。False时直接返回只读预设（不复制），
+                     True时返回可修改的深拷贝
+        """
         if preset_name not in cls.PRESETS:
             raise ValueError(f"未知预设: {preset_name}")
         
-        return cls.PRESETS[preset_name].copy()
+        preset = cls.PRESETS[preset_name]
+        return _thaw(preset) if mutable else preset
     
     @classmethod
     def get_auto_config(cls) -> Dict[str, Any]:
         """根据系统资源自动推荐配置"""
         # 获取系统信息
-        cpu_count = psutil.cpu_count()
-        memory_gb = psutil.virtual_memory().total / (1024**3)
+        cpu_count = _cpu_count()
+        memory_gb = _virtual_memory().total / (1024**3)
         
         print(f" 检测系统资源:")
         print(f"   CPU核心数: {cpu_count}")
@@ -109,7 +154,7 @@ class ParallelConfig:
             preset = 'extreme'
             reason = "系统资源充足"
         
-        config = cls.get_preset(preset)
+        config = cls.get_preset(preset, mutable=True)
         config['auto_reason'] = reason
         
         print(f" 推荐配置: {config['name']} ({reason})")
@@ -119,7 +164,7 @@ class ParallelConfig:
     @classmethod
     def customize_config(cls, base_preset: str = 'balanced', **overrides) -> Dict[str, Any]:
         """基于预设自定义配置"""
-        config = cls.get_preset(base_preset)
+        config = cls.get_preset(base_preset, mutable=True)
         
         # 应用覆盖参数
         for key, value in overrides.items():
@@ -175,15 +220,16 @@ class ParallelConfig:
         if config['max_workers'] > config['pool_size']:
             warnings.append("线程数超过驱动池大小可能导致线程等待")
         
-        if config['max_workers'] > psutil.cpu_count() * 2:
-            warnings.append(f"线程数({config['max_workers']})超过CPU核心数({psutil.cpu_count()})的2倍")
+        cpu_count = _cpu_count()
+        if config['max_workers'] > cpu_count * 2:
+            warnings.append(f"线程数({config['max_workers']})超过CPU核心数({cpu_count})的2倍")
         
         if config['batch_size'] < config['max_workers'] * 5:
             warnings.append("批次大小过小可能无法充分利用并发能力")
         
         # 资源检查
         estimated_memory = config['pool_size'] * 150  # 每个WebDriver约150MB
-        available_memory = psutil.virtual_memory().available / (1024**2)
+        available_memory = _virtual_memory().available / (1024**2)
         
         if estimated_memory > available_memory * 0.8:
             issues.append(f"内存不足预计需要{estimated_memory:.0f}MB可用{available_memory:.0f}MB")
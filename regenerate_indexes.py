@@ -6,12 +6,17 @@
 """
 
 import os
+import sys
 import json
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List
 from collections import defaultdict
 
+def _intern(value):
+    """驻留重复度高的字符串，相同取值共用一个对象（非字符串原样返回）"""
+    return sys.intern(value) if type(value) is str else value
+
 class IndexRegenerator:
     """索引重新生成器"""
     
@@ -92,9 +97,8 @@ class IndexRegenerator:
         
         try:
             df = pd.read_csv(self.master_csv)
-            master_dict = {}
-            for _, row in df.iterrows():
-                master_dict[str(row['project_id'])] = row.to_dict()
+            # 整列转换后一次性建字典，避免iterrows逐行构造Series
+            master_dict = dict(zip(df['project_id'].astype(str), df.to_dict('records')))
             print(f"加载master数据: {len(master_dict)} 个项目")
             return master_dict
         except Exception as e:
@@ -114,17 +118,18 @@ class IndexRegenerator:
                 'id': project_id,
                 'url': project.get('url', master_info.get('url', '')),
                 'title': project.get('title', master_info.get('title', '')),
-                'brand': project.get('brand', master_info.get('brand', '')),
-                'agency': project.get('agency', master_info.get('agency', '')),
-                'publish_date': project.get('publish_date', master_info.get('publish_date', '')),
+                # 品牌、代理商、日期、分类等取值大量重复，驻留后几千个项目共用少量字符串对象
+                'brand': _intern(project.get('brand', master_info.get('brand', ''))),
+                'agency': _intern(project.get('agency', master_info.get('agency', ''))),
+                'publish_date': _intern(project.get('publish_date', master_info.get('publish_date', ''))),
                 'description': project.get('description', ''),
                 'images': project.get('images', []),
-                'category': project.get('category', ''),
+                'category': _intern(project.get('category', '')),
                 'keywords': project.get('keywords', []),
-                'industry': project.get('industry', ''),
-                'campaign_type': project.get('campaign_type', ''),
+                'industry': _intern(project.get('industry', '')),
+                'campaign_type': _intern(project.get('campaign_type', '')),
                 'project_info': project.get('project_info', {}),
-                '_batch': project.get('_batch', '')
+                '_batch': _intern(project.get('_batch', ''))
             }
             merged.append(merged_project)
         
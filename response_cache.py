@@ -0,0 +1,110 @@
+"""
+回答缓存
+精确匹配（LRU）+ 可选的语义匹配，供GeminiClient和SmartAIAssistant共用
+"""
+
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# numpy可选：仅语义缓存需要，未安装时只使用精确缓存
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ResponseCache:
+    """
+    回答缓存：精确匹配（LRU，可设有效期）+ 可选的语义匹配
+    
+    精确层的键由调用方决定（GeminiClient用make_key生成的哈希）；语义层保存查询向量矩阵，
+    余弦相似度和结果ID重合度都达到阈值时视为命中。
+    """
+
+    def __init__(self, max_size: int = 256, ttl: Optional[float] = None,
+                 similarity_threshold: float = 0.92, overlap_threshold: float = 0.8):
+        self.max_size = max_size
+        self.ttl = ttl  # 精确层记录的有效期（秒），None表示不过期
+        self.similarity_threshold = similarity_threshold
+        self.overlap_threshold = overlap_threshold
+        self._exact: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()  # 键 -> (写入时间, 回答)
+        # 语义层：预分配的连续float32矩阵（每行一个归一化向量），前_n_used行有效；
+        # 容量按倍增扩展至max_size，写满后按环形缓冲覆盖最早的行
+        self._matrix = None
+        self._n_used = 0
+        self._next_row = 0
+        self._semantic_entries: List[Tuple[frozenset, str]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, result_ids: frozenset, query_info: Optional[Dict] = None) -> str:
+        """根据查询、搜索结果ID和查询信息（回答提示词的一部分）生成缓存键"""
+        raw = (query.strip() + '\x00' + '\x00'.join(sorted(result_ids)) + '\x00'
+               + json.dumps(query_info, ensure_ascii=False, sort_keys=True, default=str))
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: str):
+        with self._lock:
+            self._exact[key] = (time.monotonic(), value)
+            self._exact.move_to_end(key)
+            if len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+
+    def get_similar(self, embedding, result_ids: frozenset) -> Optional[str]:
+        """语义查找：返回最相似且结果集足够重合的缓存回答"""
+        with self._lock:
+            if not self._n_used:
+                return None
+            # 一次矩阵-向量乘法得到与所有缓存查询的余弦相似度
+            scores = self._matrix[:self._n_used] @ embedding
+            candidates = np.flatnonzero(scores >= self.similarity_threshold)
+            for idx in candidates[np.argsort(scores[candidates])[::-1]]:
+                cached_ids, value = self._semantic_entries[idx]
+                union = cached_ids | result_ids
+                overlap = len(cached_ids & result_ids) / len(union) if union else 1.0
+                if overlap >= self.overlap_threshold:
+                    return value
+            return None
+
+    def put_similar(self, embedding, result_ids: frozenset, value: str):
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.empty((min(64, self.max_size), embedding.shape[0]), dtype=np.float32)
+            row = self._next_row
+            if row == self._matrix.shape[0] and row < self.max_size:
+                # 容量不足时倍增（不超过max_size）
+                grown = np.empty((min(row * 2, self.max_size), self._matrix.shape[1]), dtype=np.float32)
+                grown[:row] = self._matrix
+                self._matrix = grown
+            self._matrix[row] = embedding
+            if row < len(self._semantic_entries):
+                self._semantic_entries[row] = (result_ids, value)
+            else:
+                self._semantic_entries.append((result_ids, value))
+            self._n_used = max(self._n_used, row + 1)
+            # 写满后回到第0行，覆盖最早的记录
+            self._next_row = (row + 1) % self.max_size
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            self._matrix = None
+            self._n_used = 0
+            self._next_row = 0
+            self._semantic_entries = []
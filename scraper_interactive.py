@@ -350,6 +350,7 @@ class EnhancedScraperV3:
             # 获取WebDriver
             driver_pool = get_global_pool()
             driver = driver_pool.get_driver()
+            failed = True  # 成功拿到项目数据前都视为失败，归还时强制探测驱动存活
             
             try:
                 # 访问页面
@@ -380,10 +381,11 @@ class EnhancedScraperV3:
                         'project_info': project_data.get('project_info', {})
                     }
                     
+                    failed = False
                     return final_data
                 
             finally:
-                driver_pool.return_driver(driver)
+                driver_pool.return_driver(driver, failed=failed)
                 
         except Exception as e:
             print(f"爬取项目失败 {url}: {e}")
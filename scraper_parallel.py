@@ -61,7 +61,7 @@ def main():
         if args.preset == 'auto':
             config = ParallelConfig.get_auto_config()
         else:
-            config = ParallelConfig.get_preset(args.preset)
+            config = ParallelConfig.get_preset(args.preset, mutable=True)
         
         # 应用覆盖参数
         if args.max_workers:
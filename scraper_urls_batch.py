@@ -38,6 +38,89 @@ from datetime import datetime
 import re
 import os
 import pickle
+import requests
+from lxml import html as lxml_html
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from queue import Queue
+from driver_pool import find_chrome_driver_path
+
+# orjson可选：序列化/解析进度文件更快，未安装时使用标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 预编译的正则表达式（每个项目卡片都会用到）
+_BRAND_RE = re.compile(r'Brand[:\s]*([^\n]+?)(?:\s*By[:\s]*([^\n]+?))?(?:\n|$)', re.I)
+_DATE_RE = re.compile(r'(\d{4}[-/]\d{1,2}[-/]\d{1,2})')
+_PROJECT_LINK_RE = re.compile(r'/projects/\d+\.html')
+_COMPANY_ID_RE = re.compile(r'/company/projects/(\d+)')
+_UNSAFE_SHEET_CHARS_RE = re.compile(r'[^\w\s-]')
+
+_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+               '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# 公司名称XPath（对应 h1.company-name / .company-title / [class*="company"] h1）
+_COMPANY_NAME_XPATHS = [
+    "//h1[contains(concat(' ', normalize-space(@class), ' '), ' company-name ')]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' company-title ')]",
+    "//*[contains(@class, 'company')]//h1",
+]
+
+# 项目列表元素的候选选择器合并为一个CSS并集，只需一次DOM查询
+_PROJECT_ELEMENT_SELECTOR = ', '.join([
+    'a[href*="/projects/"][href$=".html"]',
+    'li.work-item',
+    'div.project-item',
+    'article.project',
+    '[class*="project"]',
+    '[class*="work"]',
+])
+
+# 无效标题（导航、栏目名等）
+_INVALID_TITLES = frozenset({'全部', '每周项目精选', '查看更多', '加载更多', '项目'})
+
+# 在页面内一次性收集所有项目卡片的原始数据，避免逐个元素的WebDriver往返：
+# 从项目链接向上最多查找5层，取第一个 li/article/div 作为项目容器，
+# 收集链接、标题、卡片文本、图片和点赞数，由 build_project_from_card 转换为项目信息
+JS_EXTRACT_PROJECT_CARDS = """
+var links = document.querySelectorAll('a[href*="/projects/"][href$=".html"]');
+var seen = new Set();
+var cards = [];
+for (var i = 0; i < links.length; i++) {
+    var container = links[i];
+    for (var depth = 0; depth < 5 && container.parentElement; depth++) {
+        var parent = container.parentElement;
+        var tag = parent.tagName.toLowerCase();
+        if (tag === 'li' || tag === 'article' || tag === 'div') {
+            if (!seen.has(parent)) {
+                seen.add(parent);
+                var link = parent.querySelector('a[href*="/projects/"][href$=".html"]');
+                if (link) {
+                    var title = (link.innerText || '').trim() || link.getAttribute('title') || '';
+                    if (!title) {
+                        var heading = parent.querySelector('h3, h4, h5');
+                        title = heading ? (heading.innerText || '').trim() : '';
+                    }
+                    var img = parent.querySelector('img');
+                    var like = parent.querySelector('[class*="like"], [class*="vote"], [class*="count"]');
+                    cards.push({
+                        link: link.href,
+                        title: title,
+                        text: parent.innerText || '',
+                        image_url: img ? img.src : '',
+                        likes: like ? (like.innerText || '').trim() : null
+                    });
+                }
+            }
+            break;
+        }
+        container = parent;
+    }
+}
+return cards;
+"""
 
 
 class DigitalingSeleniumScraper:
@@ -58,8 +141,7 @@ class DigitalingSeleniumScraper:
         self.options.add_argument('--disable-blink-features=AutomationControlled')
         self.options.add_experimental_option("excludeSwitches", ["enable-automation"])
         self.options.add_experimental_option('useAutomationExtension', False)
-        self.options.add_argument(
-            'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        self.options.add_argument(f'user-agent={_USER_AGENT}')
 
         # 其他有用的选项
         self.options.add_argument('--no-sandbox')
@@ -67,9 +149,15 @@ class DigitalingSeleniumScraper:
         self.options.add_argument('--disable-gpu')
         self.options.add_argument('--window-size=1920,1080')
 
+        # 不加载图片：列表页只读取img的src地址，不需要图片内容
+        self.options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        self.options.add_argument('--blink-settings=imagesEnabled=false')
+
+        self.headless = headless
         self.driver_path = driver_path
         self.driver = None
         self.wait = None
+        self.session = None  # 静态页面请求（不需要JS渲染时使用）
 
         # 进度文件
         self.progress_file = 'scraper_progress.json'
@@ -77,35 +165,17 @@ class DigitalingSeleniumScraper:
 
     def find_chrome_driver(self):
         """查找ChromeDriver的路径"""
-        # 可能的ChromeDriver文件名
-        possible_names = ['chromedriver.exe', 'chromedriver']
-
         # 1. 首先检查是否指定了路径
         if self.driver_path and os.path.exists(self.driver_path):
             return self.driver_path
 
-        # 2. 在当前目录查找
-        for name in possible_names:
-            if os.path.exists(name):
-                print(f"✓ 在当前目录找到ChromeDriver: {name}")
-                return os.path.abspath(name)
-
-        # 3. 在项目根目录的各个可能位置查找
-        possible_dirs = [
-            '.',  # 当前目录
-            './drivers',  # drivers子目录
-            './chromedriver',  # chromedriver子目录
-            '../',  # 上级目录
-        ]
-
-        for dir_path in possible_dirs:
-            for name in possible_names:
-                full_path = os.path.join(dir_path, name)
-                if os.path.exists(full_path):
-                    print(f"✓ 找到ChromeDriver: {full_path}")
-                    return os.path.abspath(full_path)
-
-        # 4. 如果都没找到，返回None（将尝试使用系统PATH中的）
+        # 2. 在当前目录及项目常见位置查找（结果缓存，多个工作浏览器只扫描一次）
+        driver_path = find_chrome_driver_path()
+        if driver_path:
+            print(f"✓ 找到ChromeDriver: {driver_path}")
+            return driver_path
+
+        # 3. 如果都没找到，返回None（将尝试使用系统PATH中的）
         return None
 
     def start_driver(self):
@@ -141,85 +211,64 @@ class DigitalingSeleniumScraper:
             self.driver.quit()
             print("✓ Chrome驱动已关闭")
 
-    def extract_project_info(self, element):
-        """从元素中提取项目信息"""
-        project = {}
-
-        try:
-            # 查找项目链接
-            link_elem = element.find_element(By.CSS_SELECTOR, 'a[href*="/projects/"][href$=".html"]')
-            project['link'] = link_elem.get_attribute('href')
-
-            # 获取标题
-            project['title'] = link_elem.text.strip() or link_elem.get_attribute('title') or ''
-
-            # 如果标题为空，尝试其他方式
-            if not project['title']:
-                try:
-                    title_elem = element.find_element(By.CSS_SELECTOR, 'h3, h4, h5')
-                    project['title'] = title_elem.text.strip()
-                except:
-                    pass
+    def parse_project_text(self, project, element_text):
+        """从项目卡片文本中提取品牌、代理商和发布日期"""
+        # 提取品牌信息
+        brand_match = _BRAND_RE.search(element_text)
+        if brand_match:
+            project['brand'] = brand_match.group(1).strip()
+            if brand_match.group(2):
+                project['agency'] = brand_match.group(2).strip().split()[0]  # 取第一个词作为代理商
 
-            # 获取元素的所有文本
-            element_text = element.text
+        # 提取日期
+        date_match = _DATE_RE.search(element_text)
+        if date_match:
+            project['publish_date'] = date_match.group(1).replace('/', '-')
 
-            # 提取品牌信息
-            brand_match = re.search(r'Brand[:\s]*([^\n]+?)(?:\s*By[:\s]*([^\n]+?))?(?:\n|$)', element_text, re.I)
-            if brand_match:
-                project['brand'] = brand_match.group(1).strip()
-                if brand_match.group(2):
-                    project['agency'] = brand_match.group(2).strip().split()[0]  # 取第一个词作为代理商
+    def build_project_from_card(self, card):
+        """将页面内JS收集的卡片数据转换为项目信息"""
+        project = {'link': card.get('link'), 'title': card.get('title') or ''}
+        self.parse_project_text(project, card.get('text') or '')
 
-            # 提取日期
-            date_match = re.search(r'(\d{4}[-/]\d{1,2}[-/]\d{1,2})', element_text)
-            if date_match:
-                project['publish_date'] = date_match.group(1).replace('/', '-')
+        img_url = card.get('image_url')
+        if img_url and not img_url.startswith('data:'):
+            project['image_url'] = img_url
 
-            # 提取图片
-            try:
-                img_elem = element.find_element(By.TAG_NAME, 'img')
-                img_url = img_elem.get_attribute('src')
-                if img_url and not img_url.startswith('data:'):
-                    project['image_url'] = img_url
-            except:
-                pass
-
-            # 提取点赞数或其他互动数据
-            try:
-                like_elem = element.find_element(By.CSS_SELECTOR, '[class*="like"], [class*="vote"], [class*="count"]')
-                project['likes'] = like_elem.text.strip()
-            except:
-                pass
-
-        except Exception as e:
-            print(f"提取项目信息时出错: {e}")
-            return None
+        if card.get('likes') is not None:
+            project['likes'] = card['likes']
 
         return project if project.get('title') and project.get('link') else None
 
+    def wait_for_page_ready(self, timeout=10):
+        """等待页面加载完成（document.readyState为complete），代替固定时长的sleep"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda d: d.execute_script('return document.readyState') == 'complete'
+            )
+            return True
+        except TimeoutException:
+            return False
+
     def wait_for_projects_load(self):
         """等待项目列表加载"""
         try:
             # 等待页面加载完成
             self.wait.until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-            time.sleep(2)  # 额外等待，确保动态内容加载
 
-            # 尝试多种可能的选择器
-            selectors = [
-                'a[href*="/projects/"][href$=".html"]',
-                'li.work-item',
-                'div.project-item',
-                'article.project',
-                '[class*="project"]',
-                '[class*="work"]'
-            ]
+            # 等待动态内容中的项目链接出现（出现即返回，不再固定等待）
+            try:
+                WebDriverWait(self.driver, 5).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="/projects/"][href$=".html"]'))
+                )
+                print("✓ 找到项目元素")
+                return True
+            except TimeoutException:
+                pass
 
-            for selector in selectors:
-                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    print(f"✓ 找到项目元素，使用选择器: {selector}")
-                    return True
+            # 项目链接未出现时，用候选选择器的并集一次性检查其他项目容器
+            if self.driver.find_elements(By.CSS_SELECTOR, _PROJECT_ELEMENT_SELECTOR):
+                print("✓ 找到项目元素")
+                return True
 
             return False
         except:
@@ -234,29 +283,20 @@ class DigitalingSeleniumScraper:
             print("✗ 未找到项目元素")
             return projects
 
-        # 查找所有包含项目链接的元素
-        project_links = self.driver.find_elements(By.CSS_SELECTOR, 'a[href*="/projects/"][href$=".html"]')
-
-        # 获取每个链接的父容器作为项目元素
-        processed_containers = set()
+        # 一次JS调用收集所有项目卡片（链接的父容器）的原始数据
+        try:
+            cards = self.driver.execute_script(JS_EXTRACT_PROJECT_CARDS) or []
+        except Exception as e:
+            print(f"提取项目卡片时出错: {e}")
+            return projects
 
-        for link in project_links:
+        for card in cards:
             try:
-                # 向上查找合适的容器元素
-                container = link
-                for _ in range(5):  # 最多向上查找5层
-                    parent = container.find_element(By.XPATH, '..')
-                    if parent.tag_name in ['li', 'article', 'div']:
-                        # 检查是否已处理过这个容器
-                        container_id = id(parent)
-                        if container_id not in processed_containers:
-                            processed_containers.add(container_id)
-                            project = self.extract_project_info(parent)
-                            if project and self.is_valid_project(project):
-                                projects.append(project)
-                            break
-                    container = parent
-            except:
+                project = self.build_project_from_card(card)
+                if project and self.is_valid_project(project):
+                    projects.append(project)
+            except Exception as e:
+                print(f"提取项目信息时出错: {e}")
                 continue
 
         return projects
@@ -268,12 +308,11 @@ class DigitalingSeleniumScraper:
             return False
 
         # 过滤无效标题
-        invalid_titles = ['全部', '每周项目精选', '查看更多', '加载更多', '项目']
-        if project['title'] in invalid_titles:
+        if project['title'] in _INVALID_TITLES:
             return False
 
         # 确保链接格式正确
-        if not re.search(r'/projects/\d+\.html', project['link']):
+        if not _PROJECT_LINK_RE.search(project['link']):
             return False
 
         return True
@@ -303,7 +342,13 @@ class DigitalingSeleniumScraper:
 
                 # 点击
                 self.driver.execute_script("arguments[0].click();", next_link)
-                time.sleep(2)  # 等待页面加载
+
+                # 等待旧页面失效并加载完成
+                try:
+                    WebDriverWait(self.driver, 5).until(EC.staleness_of(next_link))
+                except TimeoutException:
+                    pass
+                self.wait_for_page_ready()
                 return True
 
         except Exception as e:
@@ -313,11 +358,16 @@ class DigitalingSeleniumScraper:
 
     def get_company_name_from_url(self, url):
         """从URL中提取公司名称"""
+        # 公司名称在服务端渲染的HTML里，先用轻量的HTTP请求获取，省去一次浏览器页面加载
+        company_name = self._get_company_name_static(url)
+        if company_name:
+            return company_name
+
         # 尝试从页面获取公司名称
         try:
             # 访问页面
             self.driver.get(url)
-            time.sleep(2)
+            self.wait_for_page_ready()
 
             # 尝试多种选择器查找公司名
             selectors = [
@@ -330,16 +380,8 @@ class DigitalingSeleniumScraper:
             for selector in selectors:
                 try:
                     if selector == 'title':
-                        title = self.driver.title
-                        # 从标题中提取公司名
-                        if '|' in title:
-                            company_name = title.split('|')[0].strip()
-                        elif '-' in title:
-                            company_name = title.split('-')[0].strip()
-                        else:
-                            company_name = title.strip()
-
-                        if company_name and len(company_name) < 50:
+                        company_name = self._company_name_from_title(self.driver.title)
+                        if company_name:
                             return company_name
                     else:
                         elem = self.driver.find_element(By.CSS_SELECTOR, selector)
@@ -353,15 +395,55 @@ class DigitalingSeleniumScraper:
             pass
 
         # 如果无法从页面获取，从URL提取
-        match = re.search(r'/company/projects/(\d+)', url)
+        match = _COMPANY_ID_RE.search(url)
         if match:
             return f"公司_{match.group(1)}"
 
         return "未知公司"
 
+    def _get_company_name_static(self, url):
+        """直接请求页面HTML并用lxml解析公司名称，失败时返回None"""
+        try:
+            if self.session is None:
+                self.session = requests.Session()
+                self.session.headers['User-Agent'] = _USER_AGENT
+
+            response = self.session.get(url, timeout=10)
+            response.raise_for_status()
+
+            # 被重定向到首页时页面标题不是公司名
+            if 'dindex' in response.url:
+                return None
+
+            tree = lxml_html.fromstring(response.content)
+        except Exception:
+            return None
+
+        for xpath in _COMPANY_NAME_XPATHS:
+            for elem in tree.xpath(xpath):
+                company_name = elem.text_content().strip()
+                if company_name:
+                    return company_name
+
+        return self._company_name_from_title(tree.findtext('.//title') or '')
+
+    def _company_name_from_title(self, title):
+        """从页面标题中提取公司名"""
+        if '|' in title:
+            company_name = title.split('|')[0].strip()
+        elif '-' in title:
+            company_name = title.split('-')[0].strip()
+        else:
+            company_name = title.strip()
+
+        if company_name and len(company_name) < 50:
+            return company_name
+        return None
+
     def scrape_all_projects(self, start_url, max_pages=16):
-        """抓取所有项目"""
+        """抓取所有项目（按链接去重，返回的项目列表无重复）"""
         all_projects = []
+        seen_links = set()
 
         try:
             # 获取公司名称
@@ -371,14 +453,14 @@ class DigitalingSeleniumScraper:
             # 访问起始页面
             print(f"访问页面: {start_url}")
             self.driver.get(start_url)
-            time.sleep(3)  # 等待页面完全加载
+            self.wait_for_page_ready()  # 等待页面完全加载
 
             # 检查是否被重定向
             current_url = self.driver.current_url
             if 'dindex' in current_url:
                 print("✗ 被重定向到首页，尝试重新导航...")
                 self.driver.get(start_url)
-                time.sleep(3)
+                self.wait_for_page_ready()
 
             # 抓取多页数据
             empty_page_count = 0
@@ -388,7 +470,11 @@ class DigitalingSeleniumScraper:
                 # 抓取当前页
                 projects = self.scrape_current_page()
                 if projects:
-                    all_projects.extend(projects)
+                    # 收集时即按链接去重，不再事后二次遍历
+                    for project in projects:
+                        if project['link'] not in seen_links:
+                            seen_links.add(project['link'])
+                            all_projects.append(project)
                     print(f"✓ 获取到 {len(projects)} 个项目")
                     empty_page_count = 0  # 重置空页计数
 
@@ -446,32 +532,46 @@ class DigitalingSeleniumScraper:
         """加载进度信息"""
         if os.path.exists(self.progress_file):
             try:
-                with open(self.progress_file, 'r', encoding='utf-8') as f:
-                    progress = json.load(f)
-                return progress
+                return self._read_json(self.progress_file)
             except:
                 return {}
         return {}
 
     def save_progress(self, progress):
         """保存进度信息"""
-        with open(self.progress_file, 'w', encoding='utf-8') as f:
-            json.dump(progress, f, ensure_ascii=False, indent=2)
+        self._write_json_atomic(self.progress_file, progress)
 
     def load_scraped_data(self):
         """加载已抓取的数据"""
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return self._read_json(self.data_file)
             except:
                 return {}
         return {}
 
     def save_scraped_data(self, data):
         """保存已抓取的数据"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        self._write_json_atomic(self.data_file, data)
+
+    def _write_json_atomic(self, filename, data):
+        """先写临时文件再原子替换，Ctrl+C或崩溃时不会留下写了一半的文件"""
+        tmp_file = f"{filename}.tmp"
+        if orjson is not None:
+            with open(tmp_file, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, filename)
+
+    def _read_json(self, filename):
+        """读取JSON文件（优先使用orjson）"""
+        if orjson is not None:
+            with open(filename, 'rb') as f:
+                return orjson.loads(f.read())
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
 
     def scrape_multiple_companies_incremental(self, urls_file='urls.txt', resume=True):
         """批量抓取多个公司的项目（支持断点续爬）"""
@@ -510,16 +610,8 @@ class DigitalingSeleniumScraper:
                 print('=' * 60)
 
                 try:
-                    # 抓取项目
-                    projects, company_name = self.scrape_all_projects(url, max_pages)
-
-                    # 去重
-                    unique_projects = []
-                    seen_links = set()
-                    for project in projects:
-                        if project['link'] not in seen_links:
-                            seen_links.add(project['link'])
-                            unique_projects.append(project)
+                    # 抓取项目（已按链接去重）
+                    unique_projects, company_name = self.scrape_all_projects(url, max_pages)
 
                     # 保存数据
                     if unique_projects:
@@ -575,6 +667,126 @@ class DigitalingSeleniumScraper:
 
         return all_company_data
 
+    def scrape_multiple_companies_parallel(self, urls_file='urls.txt', resume=True, max_workers=3, delay=5):
+        """
+        并行抓取多个公司的项目（每个工作线程独占一个浏览器，支持断点续爬）
+
+        Args:
+            urls_file: URL列表文件
+            resume: 是否继续之前的进度
+            max_workers: 并行浏览器数量
+            delay: 每个浏览器抓完一个公司后的等待秒数，避免请求过快
+        """
+        url_list = self.read_urls_from_file(urls_file)
+
+        if not url_list:
+            print("没有找到要抓取的URL")
+            return {}
+
+        progress = self.load_progress() if resume else {}
+        all_company_data = self.load_scraped_data() if resume else {}
+
+        completed_urls = progress.get('completed', [])
+        if completed_urls and resume:
+            print(f"\n✓ 找到进度文件，已完成 {len(completed_urls)}/{len(url_list)} 个URL")
+            print("继续之前的抓取...\n")
+
+        pending = [(url, max_pages) for url, max_pages in url_list
+                   if not (resume and url in completed_urls)]
+        if not pending:
+            print("所有URL均已完成")
+            return all_company_data
+
+        # 每个工作线程从队列借用一个独立的爬虫实例（WebDriver不能跨线程共享）
+        workers = Queue()
+        all_workers = []  # 中断时正在使用的浏览器不在队列里，也要能关闭
+        worker_count = min(max_workers, len(pending))
+        for _ in range(worker_count):
+            worker = DigitalingSeleniumScraper(headless=self.headless, driver_path=self.driver_path)
+            try:
+                worker.start_driver()
+                workers.put(worker)
+                all_workers.append(worker)
+            except Exception as e:
+                print(f"✗ 启动工作浏览器失败: {e}")
+
+        if workers.empty():
+            print("✗ 没有可用的浏览器，停止抓取")
+            return all_company_data
+
+        print(f"\n使用 {workers.qsize()} 个浏览器并行抓取 {len(pending)} 个公司")
+
+        def scrape_company(url, max_pages):
+            worker = workers.get()
+            try:
+                return worker.scrape_all_projects(url, max_pages)
+            finally:
+                # 同一个浏览器两次抓取之间休息一下，与顺序抓取的节奏一致
+                if delay:
+                    time.sleep(delay)
+                workers.put(worker)
+
+        # 不使用with：with退出时会等待全部任务完成，Ctrl+C后仍会把剩余公司抓完
+        executor = ThreadPoolExecutor(max_workers=workers.qsize())
+        try:
+            futures = {executor.submit(scrape_company, url, max_pages): url
+                       for url, max_pages in pending}
+
+            # 结果汇总、进度保存都在主线程完成，无需加锁
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    unique_projects, company_name = future.result()
+
+                    if unique_projects:
+                        all_company_data[company_name] = unique_projects
+                        print(f"\n✓ {company_name}: 获取到 {len(unique_projects)} 个唯一项目")
+                    else:
+                        print(f"\n✗ {company_name}: 未获取到项目")
+
+                    completed_urls.append(url)
+                    progress['completed'] = completed_urls
+                    progress['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    progress['total'] = len(url_list)
+                except Exception as e:
+                    print(f"\n✗ 抓取 {url} 时出错: {e}")
+
+                self.save_progress(progress)
+                self.save_scraped_data(all_company_data)
+
+        except KeyboardInterrupt:
+            print("\n\n⚠ 用户中断操作")
+            # 取消尚未开始的公司，不等待正在进行的抓取
+            executor.shutdown(wait=False, cancel_futures=True)
+            print("正在保存当前进度...")
+            self.save_progress(progress)
+            self.save_scraped_data(all_company_data)
+            print("✓ 进度已保存，下次运行将从断点继续")
+
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # 关闭所有浏览器（包括中断时仍在使用的），正在进行的抓取会随之结束
+            for worker in all_workers:
+                try:
+                    worker.close_driver()
+                except Exception as e:
+                    print(f"关闭浏览器失败: {e}")
+
+        # 全部完成后统一生成Excel
+        if all_company_data:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            excel_filename = f'digitaling_projects_incremental_{timestamp}.xlsx'
+            self.save_to_excel_multiple_sheets(all_company_data, excel_filename)
+
+        if len(completed_urls) == len(url_list):
+            print("\n✓ 所有URL抓取完成！")
+            if os.path.exists(self.progress_file):
+                os.remove(self.progress_file)
+            if os.path.exists(self.data_file):
+                os.remove(self.data_file)
+
+        return all_company_data
+
     def save_to_excel_multiple_sheets(self, all_company_data, filename='digitaling_all_projects.xlsx'):
         """保存多个公司的数据到Excel的不同sheet"""
         if not all_company_data:
@@ -597,7 +809,7 @@ class DigitalingSeleniumScraper:
                 df = df[existing_columns + other_columns]
 
                 # 清理sheet名称（Excel sheet名称有限制）
-                sheet_name = re.sub(r'[^\w\s-]', '', company_name)[:31]  # Excel sheet名最多31字符
+                sheet_name = _UNSAFE_SHEET_CHARS_RE.sub('', company_name)[:31]  # Excel sheet名最多31字符
 
                 # 写入各公司的sheet
                 df.to_excel(writer, sheet_name=sheet_name, index=False)
@@ -723,8 +935,15 @@ https://www.digitaling.com/company/projects/10234
                     os.remove(file)
             print("已清理旧进度，开始全新抓取")
 
+    # 并行浏览器数量，默认1即逐个公司顺序抓取
+    workers_input = input("并行浏览器数量（直接回车为1，即顺序抓取）: ").strip()
+    max_workers = int(workers_input) if workers_input.isdigit() and int(workers_input) > 0 else 1
+
     # 批量抓取（支持断点续爬）
-    all_data = scraper.scrape_multiple_companies_incremental('urls.txt', resume=resume)
+    if max_workers > 1:
+        all_data = scraper.scrape_multiple_companies_parallel('urls.txt', resume=resume, max_workers=max_workers)
+    else:
+        all_data = scraper.scrape_multiple_companies_incremental('urls.txt', resume=resume)
 
     # 最终统计
     if all_data:
@@ -7,15 +7,22 @@
 
 import json
 import os
+import threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import re
 
 from prompt_manager import PromptManager
-from gemini_client import GeminiClient
-from deepseek_client import DeepSeekClient
 from config_optimized import get_config
+from response_cache import ResponseCache
+
+# orjson可选：加载batch详情文件更快，未安装时使用标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 class ContentLengthManager:
     """内容长度智能管理器"""
@@ -50,27 +57,49 @@ class ContentLengthManager:
 class SmartQueryExecutor:
     """智能查询执行器 - 基于CSV数据"""
     
+    # 与过滤条件无关的查询结果（品牌/代理商列表、全量统计）只依赖数据本身，算一次后复用。
+    # 放在类上而不是实例上，因为web服务每个请求都会新建执行器；按主数据文件的(mtime, size)区分，文件变化后自动失效
+    _unfiltered_results: Dict[str, Dict[str, Any]] = {}
+    _unfiltered_signature: Optional[Tuple[int, int]] = None
+    _unfiltered_lock = threading.Lock()
+    
     def __init__(self):
         self.master_df = None
         self.scraped_df = None
+        self.publish_dates = None  # 预先解析好的发布日期，与master_df索引对齐
+        self.distinct_values: Dict[str, pd.Series] = {}  # 品牌/代理商的去重取值，模糊匹配只扫这些值
         self.content_manager = ContentLengthManager()
+        self._data_signature: Optional[Tuple[int, int]] = None  # 加载的主数据文件(mtime, size)
         
         # 加载数据
         self._load_data()
     
     def _load_data(self):
         """加载CSV数据文件"""
+        self._data_signature = None
+        self.publish_dates = None
+        self.distinct_values = {}
         try:
             # 加载主数据文件
             if os.path.exists('master_projects.csv'):
+                st = os.stat('master_projects.csv')
                 self.master_df = pd.read_csv('master_projects.csv')
+                self._data_signature = (st.st_mtime_ns, st.st_size)
                 
                 # 处理字符串字段中的NaN值，确保数据类型一致性
-                string_columns = ['brand', 'agency', 'title', 'publish_date', 'url']
-                for col in string_columns:
+                string_columns = [col for col in ['brand', 'agency', 'title', 'publish_date', 'url']
+                                  if col in self.master_df.columns]
+                # 将NaN值填充为空字符串，确保列中只有字符串类型（整块列一次处理）
+                self.master_df[string_columns] = self.master_df[string_columns].fillna('').astype(str)
+                
+                # 日期过滤每次都要用到，加载时解析一次
+                if 'publish_date' in self.master_df.columns:
+                    self.publish_dates = pd.to_datetime(self.master_df['publish_date'], errors='coerce')
+                
+                # 品牌和代理商重复度很高，预先去重，模糊匹配时只需扫描几百个不同取值而不是全部行
+                for col in ('brand', 'agency'):
                     if col in self.master_df.columns:
-                        # 将NaN值填充为空字符串，确保列中只有字符串类型
-                        self.master_df[col] = self.master_df[col].fillna('').astype(str)
+                        self.distinct_values[col] = pd.Series(self.master_df[col].unique())
                 
                 print(f"成功加载主数据: {len(self.master_df)} 个项目")
             else:
@@ -113,7 +142,7 @@ class SmartQueryExecutor:
     
     def _execute_count_query(self, instruction: Dict) -> Dict[str, Any]:
         """执行计数查询"""
-        df = self.master_df.copy()
+        df = self.master_df
         filters = instruction.get("filters", {})
         
         # 应用过滤条件
@@ -126,45 +155,74 @@ class SmartQueryExecutor:
             "execution_time": datetime.now().isoformat()
         }
     
+    def _get_unfiltered_result(self, query_type: str, compute) -> Dict[str, Any]:
+        """返回缓存的全量查询结果，首次调用时计算；每次返回的执行时间为当前时间"""
+        cls = type(self)
+        signature = self._data_signature
+        result = None
+        with cls._unfiltered_lock:
+            if signature is not None and cls._unfiltered_signature == signature:
+                result = cls._unfiltered_results.get(query_type)
+        if result is None:
+            result = compute()
+            if signature is not None:
+                with cls._unfiltered_lock:
+                    if cls._unfiltered_signature != signature:
+                        # 主数据文件已变化，丢弃旧数据的结果
+                        cls._unfiltered_results = {}
+                        cls._unfiltered_signature = signature
+                    cls._unfiltered_results[query_type] = result
+        return {**result, "execution_time": datetime.now().isoformat()}
+    
+    @classmethod
+    def clear_unfiltered_results(cls):
+        """清空缓存的全量查询结果（数据刷新后调用）"""
+        with cls._unfiltered_lock:
+            cls._unfiltered_results = {}
+            cls._unfiltered_signature = None
+    
     def _execute_list_brands_query(self, instruction: Dict) -> Dict[str, Any]:
         """列出所有品牌"""
-        df = self.master_df.copy()
+        return self._get_unfiltered_result("list_brands", self._compute_list_brands)
+    
+    def _compute_list_brands(self) -> Dict[str, Any]:
+        df = self.master_df
         
         # 获取所有唯一品牌
         brands = df['brand'].dropna().unique().tolist()
-        brand_counts = df['brand'].value_counts().to_dict()
         
-        # 按项目数量排序
-        sorted_brands = sorted(brand_counts.items(), key=lambda x: x[1], reverse=True)
+        # value_counts已按项目数量降序排列，直接取前20个，无需转成字典再排序
+        top_brands = list(df['brand'].value_counts().head(20).items())
         
         return {
             "query_type": "list_brands",
             "total_brands": len(brands),
-            "top_brands": sorted_brands[:20],  # 显示前20个
+            "top_brands": top_brands,  # 显示前20个
             "all_brands": brands,
             "execution_time": datetime.now().isoformat()
         }
     
     def _execute_list_agencies_query(self, instruction: Dict) -> Dict[str, Any]:
         """列出所有代理商"""
-        df = self.master_df.copy()
+        return self._get_unfiltered_result("list_agencies", self._compute_list_agencies)
+    
+    def _compute_list_agencies(self) -> Dict[str, Any]:
+        df = self.master_df
         
         agencies = df['agency'].dropna().unique().tolist()
-        agency_counts = df['agency'].value_counts().to_dict()
-        
-        sorted_agencies = sorted(agency_counts.items(), key=lambda x: x[1], reverse=True)
+        top_agencies = list(df['agency'].value_counts().head(20).items())
         
         return {
             "query_type": "list_agencies",
             "total_agencies": len(agencies),
-            "top_agencies": sorted_agencies[:20],
+            "top_agencies": top_agencies,
             "all_agencies": agencies,
             "execution_time": datetime.now().isoformat()
         }
     
     def _execute_search_query(self, instruction: Dict) -> Dict[str, Any]:
         """执行搜索查询"""
-        df = self.master_df.copy()
+        df = self.master_df
         filters = instruction.get("filters", {})
         limit = instruction.get("limit", 10)
         include_details = instruction.get("include_details", False)
@@ -172,11 +230,8 @@ class SmartQueryExecutor:
         # 应用过滤条件
         df = self._apply_filters(df, filters)
         
-        # 获取项目ID列表
-        project_ids = df['project_id'].tolist()
-        
-        # 智能限制返回数量
-        actual_limit = self.content_manager.calculate_response_limit("search", len(project_ids))
+        # 智能限制返回数量（只需要匹配数量，不必先生成完整的ID列表）
+        actual_limit = self.content_manager.calculate_response_limit("search", len(df))
         limited_df = df.head(actual_limit)
         
         # 构建基础结果
@@ -201,7 +256,7 @@ class SmartQueryExecutor:
     
     def _execute_aggregate_query(self, instruction: Dict) -> Dict[str, Any]:
         """执行聚合查询"""
-        df = self.master_df.copy()
+        df = self.master_df
         filters = instruction.get("filters", {})
         aggregations = instruction.get("aggregations", {})
         
@@ -237,13 +292,17 @@ class SmartQueryExecutor:
 
     def _execute_statistics_query(self, instruction: Dict) -> Dict[str, Any]:
         """执行统计查询"""
-        df = self.master_df.copy()
         filters = instruction.get("filters", {})
-
+        if not filters:
+            # 无过滤条件时统计的是全量数据，结果可复用
+            return self._get_unfiltered_result("statistics", lambda: self._compute_statistics(self.master_df))
+        
         # 应用过滤条件
-        df = self._apply_filters(df, filters)
-
-        # 统计信息
+        df = self._apply_filters(self.master_df, filters)
+        return self._compute_statistics(df)
+    
+    def _compute_statistics(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """统计信息"""
         stats = {
             "query_type": "statistics",
             "total_count": len(df),
@@ -263,7 +322,7 @@ class SmartQueryExecutor:
 
 
     def _apply_filters(self, df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
-        """应用过滤条件"""
+        """应用过滤条件（只做布尔索引返回新的DataFrame，不修改传入的df，调用方无需先复制）"""
         for field, condition in filters.items():
             if field not in df.columns:
                 continue
@@ -279,6 +338,11 @@ class SmartQueryExecutor:
                     except ValueError:
                         # 转换失败则跳过该条件
                         continue
+                elif field in self.distinct_values:
+                    # 先在去重后的取值里模糊匹配，再按命中的取值筛选行
+                    values = self.distinct_values[field]
+                    matched = values[values.str.contains(condition, na=False, case=False)]
+                    df = df[df[field].isin(matched)]
                 elif df[field].dtype == 'object':
                     # 字符串字段使用模糊匹配
                     df = df[df[field].str.contains(condition, na=False, case=False)]
@@ -296,17 +360,24 @@ class SmartQueryExecutor:
                 df = df[df[field].isin(condition)]
             elif isinstance(condition, dict):
                 # 复杂条件（如日期范围）
-                if "start" in condition and field == "publish_date":
+                if field != "publish_date":
+                    continue
+                # 取当前行对应的已解析日期，起止条件共用
+                if self.publish_dates is not None:
+                    date_series = self.publish_dates.loc[df.index]
+                else:
+                    date_series = pd.to_datetime(df[field], errors='coerce')
+                if "start" in condition:
                     try:
-                        date_series = pd.to_datetime(df[field], errors='coerce')
                         start_date = pd.to_datetime(condition["start"])
-                        df = df[date_series >= start_date]
+                        keep = date_series >= start_date
+                        df = df[keep]
+                        date_series = date_series[keep]
                     except Exception as e:
                         print(f"日期过滤错误 (start): {e}")
                         continue
-                if "end" in condition and field == "publish_date":
+                if "end" in condition:
                     try:
-                        date_series = pd.to_datetime(df[field], errors='coerce') 
                         end_date = pd.to_datetime(condition["end"])
                         df = df[date_series <= end_date]
                     except Exception as e:
@@ -326,22 +397,32 @@ class SmartQueryExecutor:
             
             # 搜索所有batch文件
             batch_files = [f for f in os.listdir(details_dir) if f.startswith('batch_') and f.endswith('.json')]
+            wanted_ids = set(project_ids)
             
             for batch_file in batch_files:
                 batch_path = os.path.join(details_dir, batch_file)
                 
                 try:
-                    with open(batch_path, 'r', encoding='utf-8') as f:
-                        batch_data = json.load(f)
+                    if orjson is not None:
+                        with open(batch_path, 'rb') as f:
+                            raw = f.read()
+                        try:
+                            batch_data = orjson.loads(raw)
+                        except orjson.JSONDecodeError:
+                            # batch文件由json.dump写出，主表空单元格会写成NaN，orjson不接受，改用标准库解析
+                            batch_data = json.loads(raw)
+                    else:
+                        with open(batch_path, 'r', encoding='utf-8') as f:
+                            batch_data = json.load(f)
                     
                     # 查找匹配的项目
                     projects = batch_data.get('projects', [])
                     for project in projects:
-                        if str(project.get('id')) in project_ids:
+                        if str(project.get('id')) in wanted_ids:
                             detailed_projects.append(project)
                             print(f"✓ 成功加载项目详情: {project.get('title', 'Unknown')[:50]}...")
                             
-                except json.JSONDecodeError as e:
+                except json.JSONDecodeError as e:  # orjson.JSONDecodeError是其子类
                     # JSON文件损坏，跳过但不打印错误（避免日志污染）
                     continue
                 except Exception as e:
@@ -356,20 +437,49 @@ class SmartQueryExecutor:
 class SmartAIAssistant:
     """智能AI助手 - 简化版"""
     
-    def __init__(self, model_provider: str = "gemini", gemini_api_key: str = None, deepseek_api_key: str = None):
+    # 回答缓存：相同问题（同一模型、同样的历史）在有效期内直接返回，不再调用两次模型。
+    # 放在类上而不是实例上，因为web服务每个请求都会新建助手实例；首次创建助手时按配置的有效期建立
+    _answer_cache: Optional[ResponseCache] = None
+    _answer_cache_lock = threading.Lock()
+    answer_cache_size = 128
+    
+    def __init__(self, model_provider: str = "gemini", gemini_api_key: str = None, deepseek_api_key: str = None,
+                 preload_in_background: bool = False):
+        """
+        Args:
+            preload_in_background: 后台读取项目数据，与AI客户端连接测试同时进行。
+                只适合启动一次的长期实例（如命令行交互）；web服务每个请求都新建助手，不要开启
+        """
         self.prompt_manager = PromptManager()
-        self.query_executor = SmartQueryExecutor()
+        self.query_executor = None
         self.config = get_config()
         self.max_history_length = self.config.get_int('MAX_CHAT_HISTORY', 5)
+        answer_cache_ttl = self.config.get_int('ANSWER_CACHE_TTL', 1800)  # 秒，0表示不缓存
+        self.answer_cache = self._get_answer_cache(answer_cache_ttl) if answer_cache_ttl > 0 else None
         self.model_provider = model_provider
         self.client = None
         self.ready = False
 
+        if preload_in_background:
+            # 读取CSV和初始化/测试AI客户端互不依赖，同时进行；with结束时线程池随之关闭
+            with ThreadPoolExecutor(max_workers=1) as loader:
+                executor_future = loader.submit(SmartQueryExecutor)
+                self._init_client(gemini_api_key, deepseek_api_key)
+            self.query_executor = executor_future.result()
+        else:
+            self.query_executor = SmartQueryExecutor()
+            self._init_client(gemini_api_key, deepseek_api_key)
+    
+    def _init_client(self, gemini_api_key: str = None, deepseek_api_key: str = None):
+        """初始化所选模型的AI客户端并测试连接，失败时ready为False"""
         try:
+            # 只导入所选模型的客户端模块，另一家的SDK/依赖不会被加载
             if self.model_provider == "gemini":
+                from gemini_client import GeminiClient
                 api_key = gemini_api_key or self.config.get('GEMINI_API_KEY')
                 self.client = GeminiClient(api_key=api_key)
             elif self.model_provider == "deepseek":
+                from deepseek_client import DeepSeekClient
                 api_key = deepseek_api_key or self.config.get('DEEPSEEK_API_KEY')
                 self.client = DeepSeekClient(api_key=api_key)
             else:
@@ -380,7 +490,7 @@ class SmartAIAssistant:
                 self.ready = self.client.test_connection() if hasattr(self.client, 'test_connection') else True
 
             if not self.ready:
-                 print(f"{model_provider.capitalize()} 客户端连接测试失败或未准备就绪。")
+                 print(f"{self.model_provider.capitalize()} 客户端连接测试失败或未准备就绪。")
 
         except Exception as e:
             print(f"AI客户端 ({self.model_provider}) 初始化失败: {e}")
@@ -407,11 +517,19 @@ class SmartAIAssistant:
                 print(f"包含历史记录: {len(history)} 条")
             print(f"{'=' * 50}")
 
+            # 0. 命中缓存直接返回
+            cache_key = (self.model_provider, user_query.strip(), formatted_history)
+            cached_answer = self.answer_cache.get(cache_key) if self.answer_cache is not None else None
+            if cached_answer is not None:
+                print("命中回答缓存")
+                return cached_answer
+
             # 1. 生成查询分析提示词
             analysis_prompt = self.prompt_manager.get_query_analysis_prompt(user_query, formatted_history)
             
             # 2. AI分析用户查询，生成查询指令
             ai_response = self.client.generate_response(analysis_prompt)
+            analysis_ok = self.client.last_response_ok
             
             # 3. 解析AI响应
             query_instruction = self._parse_ai_response(ai_response)
@@ -420,7 +538,12 @@ class SmartAIAssistant:
             query_results = self.query_executor.execute_query(query_instruction)
             
             # 5. 生成最终回答
-            final_answer = self._generate_final_answer(user_query, query_results, formatted_history)
+            final_answer, answer_ok = self._generate_final_answer(user_query, query_results, formatted_history)
+            
+            # 只缓存完整成功的回答：分析和回答都由模型正常生成，且没有退回关键词分析
+            if (self.answer_cache is not None and analysis_ok and answer_ok
+                    and not query_instruction.get("is_fallback")):
+                self.answer_cache.put(cache_key, final_answer)
             
             return final_answer
             
@@ -428,18 +551,31 @@ class SmartAIAssistant:
             error_msg = self.prompt_manager.get_error_message("query_error", error_message=str(e))
             return error_msg
 
+    @classmethod
+    def _get_answer_cache(cls, ttl: int) -> ResponseCache:
+        """获取所有助手实例共用的回答缓存，首次调用时创建"""
+        with cls._answer_cache_lock:
+            if cls._answer_cache is None:
+                cls._answer_cache = ResponseCache(max_size=cls.answer_cache_size, ttl=ttl)
+            return cls._answer_cache
+    
+    @classmethod
+    def clear_answer_cache(cls):
+        """清空回答缓存（数据刷新后调用）"""
+        with cls._answer_cache_lock:
+            if cls._answer_cache is not None:
+                cls._answer_cache.clear()
+    
     def _format_history(self, history: List[Dict[str, str]]) -> str:
         """将历史记录格式化为字符串"""
         if not history:
             return ""
         
-        formatted_lines = []
-        for message in history:
-            role = "用户" if message.get("role") == "user" else "助手"
-            content = message.get("content", "")
-            formatted_lines.append(f"{role}: {content}")
-        
-        return "\n".join(formatted_lines)
+        # 一次join生成器，不逐条append中间列表
+        return "\n".join(
+            f"{'用户' if message.get('role') == 'user' else '助手'}: {message.get('content', '')}"
+            for message in history
+        )
     
     def _parse_ai_response(self, ai_response: str) -> Dict[str, Any]:
         """解析AI响应为查询指令"""
@@ -472,7 +608,12 @@ class SmartAIAssistant:
             return self._fallback_query_analysis(ai_response)
     
     def _fallback_query_analysis(self, text: str) -> Dict[str, Any]:
-        """备用查询分析 - 基于关键词"""
+        """备用查询分析 - 基于关键词（结果带is_fallback标记，基于它生成的回答不缓存）"""
+        instruction = self._fallback_query_instruction(text)
+        instruction["is_fallback"] = True
+        return instruction
+    
+    def _fallback_query_instruction(self, text: str) -> Dict[str, Any]:
         text_lower = text.lower()
         
         # 简单的查询类型判断
@@ -507,12 +648,12 @@ class SmartAIAssistant:
     
 
     
-    def _generate_final_answer(self, original_question: str, query_results: Dict[str, Any], formatted_history: str) -> str:
-        """生成最终回答"""
+    def _generate_final_answer(self, original_question: str, query_results: Dict[str, Any], formatted_history: str) -> Tuple[str, bool]:
+        """生成最终回答，返回(回答, 是否成功)；模型调用失败时回答是错误提示，成功标记为False"""
         try:
             # 检查是否有结果
             if self._is_empty_result(query_results):
-                return self.prompt_manager.get_error_message("no_results")
+                return self.prompt_manager.get_error_message("no_results"), True
             
             # 智能截断，确保上下文不会过长
             simplified_results = self._simplify_results_for_ai(query_results)
@@ -527,20 +668,21 @@ class SmartAIAssistant:
 
             # AI生成最终回答
             final_answer = self.client.generate_response(answer_prompt)
+            answer_ok = self.client.last_response_ok
             
             # 如果有分页信息，添加分页提示
             if query_results.get("has_more", False):
                 pagination_info = self._generate_pagination_info(query_results)
                 final_answer += "\n\n" + pagination_info
             
-            return final_answer
+            return final_answer, answer_ok
             
         except Exception as e:
             # 打印详细错误以供调试
             import traceback
             print("[AI Assistant] 生成最终回答时发生错误:")
             traceback.print_exc()
-            return f"生成回答时出错: {str(e)}"
+            return f"生成回答时出错: {str(e)}", False
 
     def _simplify_results_for_ai(self, query_results: Dict[str, Any]) -> Dict[str, Any]:
         """简化查询结果以适应AI提示词长度限制"""
@@ -665,7 +807,7 @@ class SmartAIAssistant:
 def main():
     """测试智能AI助手"""
     try:
-        assistant = SmartAIAssistant()
+        assistant = SmartAIAssistant(preload_in_background=True)
         
         if not assistant.ready:
             print("AI助手未准备就绪")
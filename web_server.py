@@ -96,8 +96,7 @@ def system_status():
         index_info = {}
         if index_exists:
             try:
-                with open(index_file, 'r', encoding='utf-8') as f:
-                    index_data = json.load(f)
+                index_data = data_manager.read_json_cached(index_file)
                 index_info = index_data.get('metadata', {})
             except:
                 index_info = {"error": "索引文件读取失败"}
@@ -109,8 +108,7 @@ def system_status():
 
         if projects_exists:
             try:
-                with open(projects_file, 'r', encoding='utf-8') as f:
-                    projects_data = json.load(f)
+                projects_data = data_manager.read_json_cached(projects_file)
                 projects_count = projects_data.get('total_projects', 0)
             except:
                 projects_count = 0
@@ -279,20 +277,35 @@ class DataManager:
         self.is_refreshing = False
         self.data_file = "web_data.json"
         self.master_file = "master_projects.csv"
+        # 已解析的JSON文件：路径 -> (修改时间, 文件大小, 数据)；前端轮询时文件未变化就不重复解析
+        self._json_cache = {}
+    
+    def read_json_cached(self, path):
+        """
+        读取JSON文件，文件未变化时复用上次解析的结果
+        
+        返回顶层的浅拷贝：调用方增删顶层键不会影响缓存；嵌套的列表/字典仍与缓存共用，只能读取
+        """
+        st = os.stat(path)
+        cached = self._json_cache.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return dict(cached[2])
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._json_cache[path] = (st.st_mtime_ns, st.st_size, data)
+        return dict(data)
     
     def get_current_data(self):
         """获取当前数据"""
         try:
             if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = self.read_json_cached(self.data_file)
                 # 如果缺少top_brands，自动触发一次刷新以补齐新字段
                 if 'top_brands' not in data:
                     print("[DataManager] 发现缺少 top_brands 字段，正在自动刷新数据...")
                     self.refresh_data()
                     try:
-                        with open(self.data_file, 'r', encoding='utf-8') as f2:
-                            data = json.load(f2)
+                        data = self.read_json_cached(self.data_file)
                     except Exception:
                         pass
                 return data
@@ -351,9 +364,15 @@ class DataManager:
             print("3. 保存统计数据...")
             with open(self.data_file, 'w', encoding='utf-8') as f:
                 json.dump(stats, f, ensure_ascii=False, indent=2)
+            self._json_cache.clear()  # 数据已重新生成，丢弃之前解析的结果
             
             print(f"数据刷新成功: {stats['projects_count']}个项目, {stats['brands_count']}个品牌")
             self.last_refresh = datetime.now()
+            
+            # 数据已更新，之前缓存的AI回答可能过时
+            from smart_ai_assistant import SmartAIAssistant, SmartQueryExecutor
+            SmartAIAssistant.clear_answer_cache()
+            SmartQueryExecutor.clear_unfiltered_results()
             return True
             
         except Exception as e: